@@ -10,398 +10,321 @@ import re
 
 from context import ContextBuilder
 from strategy import BattleStrategy
+from battle_records import MoveSlot, SideState, Status
+from showdown_protocol import ProtocolDispatcher, parse_frame
+from battle_router import BattleRouter
 # Load environment variables
 load_dotenv()
 
 class BattleState:
     def __init__(self):
-        self.my_team = {}  # Format: {position: {name, hp, max_hp, status, moves}}
-        self.opponent_team = {}
-        self.active_pokemon = {'self': None, 'opponent': None}
-        self.available_moves = []
+        # Side records are mutated in place and shared with the ContextBuilder
+        self.player = SideState()
+        self.opponent = SideState()
+        self.available_moves = []  # MoveSlots from the latest request
         self.battle_id = None
         self.turn = 0
         self.weather = None
         self.field_conditions = []
         self.waiting_for_move = False
-        self.player_id = None  # To track which player we are (p1 or p2)
         
         # Initialize our strategic components
         self.context_builder = ContextBuilder()
         self.strategy_engine = BattleStrategy(model_name="gpt-3.5-turbo", temperature=0.8)
         
-        # Store the last constructed context
+        # Store the last constructed context; handlers only mark it dirty and
+        # it is rebuilt once when a decision needs it (ensure_context)
         self.current_context = {}
+        self.context_dirty = False
+        self.context_builds = 0
         
         # Track battle history for analysis
         self.battle_history = []
         self.last_decision = None
+        # In-flight LLM decision for this battle, cancelled if superseded or the battle ends
+        self.decision_task = None
+        
+        # Protocol command -> handler; each returns True when it changed battle state
+        self.dispatcher = ProtocolDispatcher({
+            'request': self._on_request,
+            'move': self._on_move,
+            'poke': self._on_poke,
+            'teampreview': self._on_start,
+            'start': self._on_start,
+            'switch': self._on_switch,
+            'drag': self._on_switch,
+            'replace': self._on_switch,
+            '-damage': self._on_condition,
+            '-heal': self._on_condition,
+            '-status': self._on_status,
+            'faint': self._on_faint,
+            'turn': self._on_turn,
+            'player': self._on_player,
+            '-weather': self._on_weather,
+            '-fieldstart': self._on_field,
+            '-fieldend': self._on_field,
+        })
+
+    @property
+    def player_id(self):
+        """Which player we are (p1 or p2), None until known"""
+        return self.player.id or None
+
+    @player_id.setter
+    def player_id(self, side_id):
+        self.player.id = side_id
+        self.opponent.id = "p2" if side_id == "p1" else "p1"
+
+    def _is_player(self, ident):
+        """Whether a protocol ident like "p1a: Name" belongs to our side"""
+        return bool(self.player_id) and ident.startswith(self.player_id)
+
+    def _side_for(self, ident):
+        return self.player if self._is_player(ident) else self.opponent
 
     def update_from_message(self, message):
-        parts = message.split('|')
-        if len(parts) < 2:
-            return
+        """Apply every line of a websocket frame; the context is rebuilt later, when a decision needs it"""
+        self.apply_messages(parse_frame(message))
+
+    def apply_messages(self, messages):
+        """Apply already-parsed protocol messages (the BattleRouter parses each frame once)"""
+        if self.dispatcher.dispatch_all(messages):
+            self.context_dirty = True
+
+    def ensure_context(self):
+        """Rebuild the context if battle state changed since the last build"""
+        if self.context_dirty:
+            self.context_dirty = False
+            self._update_context_from_battle_state()
+        return self.current_context
+
+    def _on_request(self, message):
+        # Format: |request|REQUEST (JSON)
+        if not message.arg(0):
+            return False
+        try:
+            request_data = json.loads(message.arg(0))
+        except json.JSONDecodeError as e:
+            print(f"Error parsing request data: {e}")
+            return False
         
-        command = parts[1]
-        context_updated = False  # Flag to track if we need to update context
+        # Update our player_id if not already set
+        if not self.player_id and 'side' in request_data:
+            self.player_id = request_data['side'].get('id', '')
+            print(f"Player ID set to: {self.player_id}")
         
-        # Process the message based on command type
-        if 'start' in message:
-            for part in parts:
-                if 'p2a' in part:
-                    name = part.split(':')[1]
-                    print("We are in the start message", name)
-                    self.opponent_team[name] = {
-                        'name': name,
-                        'hp': '100',
-                        'revealed': True
-                    }
-                    self.active_pokemon['opponent'] = name
-                    context_updated = True
+        # Update our team state in place
+        if 'side' in request_data:
+            self.player.apply_request(request_data['side'])
+            if self.player.active:
+                print(f"Updated active Pokemon to: {self.player.active.species}")
         
-        if command == 'request' and len(parts) >= 3 and parts[2]:
-            try:
-                request_data = json.loads(parts[2])
-                
-                # Update our player_id if not already set
-                if not self.player_id and 'side' in request_data:
-                    self.player_id = request_data['side'].get('id', '')
-                    print(f"Player ID set to: {self.player_id}")
-                
-                # Update our team state
-                if 'side' in request_data:
-                    self.my_team = {}
-                    for pokemon in request_data['side']['pokemon']:
-                        self.my_team[pokemon['ident']] = {
-                            'name': pokemon['details'],
-                            'hp': pokemon['condition'],
-                            'moves': pokemon.get('moves', []),
-                            'active': pokemon.get('active', False),
-                            'stats': pokemon.get('stats', {}),
-                            'status': pokemon.get('status', ''),
-                            'baseAbility': pokemon.get('baseAbility', '')
-                        }
-                        
-                        # Update active Pokemon
-                        if pokemon.get('active', False):
-                            pokemon_name = pokemon['details'].split(',')[0]
-                            self.active_pokemon['self'] = pokemon_name
-                            print(f"Updated active Pokemon to: {pokemon_name}")
-                
-                # Handle force switch
-                if 'forceSwitch' in request_data:
-                    self.waiting_for_move = True
-                    self.available_moves = []
-                    print("\nForce switch required!")
-                    context_updated = True
-                
-                # Handle available moves
-                if 'active' in request_data and request_data['active']:
-                    active_pokemon = request_data['active'][0]
-                    self.available_moves = active_pokemon.get('moves', [])
-                    
-                    # Track if moves are trapped, disabled, etc.
-                    for move in self.available_moves:
-                        print(f"Move: {move['move']} - PP: {move['pp']}/{move['maxpp']}")
-                        if move.get('disabled'):
-                            print(f"  - Disabled: {move['move']}")
-                        if move.get('target'):
-                            print(f"  - Target type: {move['target']}")
-                    
-                    self.waiting_for_move = True
-                
-                # Update context using ContextBuilder
-                self.current_context = self.context_builder.construct_context(request_data)
-                
-                # Print a summary of the context (optional)
-                print("\n=== BATTLE CONTEXT UPDATED FROM REQUEST ===")
-                self._print_context_summary()
-                
-            except json.JSONDecodeError as e:
-                print(f"Error parsing request data: {e}")
-
-        # Track opponent's moves for future analysis
-        elif command == 'move':
-            if len(parts) >= 5:
-                user = parts[2]
-                move = parts[3]
-                target = parts[4]
-                print(f"\nMove used: {user} used {move} on {target}")
-                
-                # If opponent used a move, record it for future analysis
-                if not user.startswith(self.player_id):
-                    opponent_pokemon = user.split(':')[1] if ':' in user else user
-                    self.context_builder.record_opponent_move(opponent_pokemon, move)
-                    
-                    # Also update opponent's active Pokemon if not already set
-                    if not self.active_pokemon['opponent']:
-                        pokemon_name = opponent_pokemon.split(',')[0]
-                        self.active_pokemon['opponent'] = pokemon_name
-                        print(f"Updated opponent's active Pokemon to: {pokemon_name}")
-                
-                context_updated = True
+        # Nothing to choose until the opponent has moved
+        if request_data.get('wait'):
+            self.waiting_for_move = False
         
-        # Handle when a Pokemon is revealed
-        elif command == 'poke':
-            # Format: |poke|PLAYER|DETAILS|ITEM
-            if len(parts) >= 4:
-                player = parts[2]
-                details = parts[3]
-                pokemon_name = details.split(',')[0]
-                
-                # If it's opponent's Pokemon, add to opponent team
-                if not player.startswith(self.player_id):
-                    # This is the first time we're seeing this Pokemon
-                    if player not in self.opponent_team:
-                        self.opponent_team[player] = {
-                            'name': details,
-                            'revealed': True
-                        }
-                        print(f"Opponent revealed: {pokemon_name}")
-                        context_updated = True
-                        
-        # Handle when a Pokemon is sent out at the start of battle
-        elif command == 'teampreview' or command == 'start':
-            # Set player_id if not already set
-            if not self.player_id and len(parts) >= 3:
-                if 'p1' in parts[2]:
-                    self.player_id = 'p1'
-                elif 'p2' in parts[2]:
-                    self.player_id = 'p2'
-                print(f"Player ID set to: {self.player_id}")
-                context_updated = True
-                
-        # Handle switch command (including initial switches at battle start)
-        elif command == 'switch':
-            # Format: |switch|POKEMON|DETAILS|HP STATUS
-            if len(parts) >= 5:
-                pokemon_full = parts[2]
-                details = parts[3]
-                hp_status = parts[4]
-                pokemon_name = details.split(',')[0]
-                
-                if pokemon_full.startswith(self.player_id):
-                    self.active_pokemon['self'] = pokemon_name
-                    print(f"Switched active Pokemon to: {pokemon_name}")
-                else:
-                    # This is the opponent's Pokemon
-                    self.active_pokemon['opponent'] = pokemon_name
-                    
-                    # Update opponent team information
-                    if pokemon_full not in self.opponent_team:
-                        self.opponent_team[pokemon_full] = {
-                            'name': details,
-                            'hp': hp_status,
-                            'revealed': True
-                        }
-                    else:
-                        self.opponent_team[pokemon_full]['hp'] = hp_status
-                        
-                    print(f"Opponent switched to: {pokemon_name} with HP {hp_status}")
-                
-                context_updated = True
-            
-        elif command == '-damage':
-            if len(parts) >= 4:
-                pokemon = parts[2]
-                new_hp = parts[3]
-                print(f"Damage dealt to {pokemon}, new HP: {new_hp}")
-                
-                # Update our team's HP if it's our Pokemon
-                if pokemon.startswith(self.player_id):
-                    poke_id = pokemon.split(':')[1]
-                    if poke_id in self.my_team:
-                        self.my_team[poke_id]['hp'] = new_hp
-                        print(f"Updated our {poke_id}'s HP to {new_hp}")
-                        context_updated = True
-                else:
-                    # Update opponent's HP
-                    for key in self.opponent_team:
-                        if key in pokemon:
-                            self.opponent_team[key]['hp'] = new_hp
-                            print(f"Updated opponent's {key}'s HP to {new_hp}")
-                            context_updated = True
+        # Handle force switch
+        if 'forceSwitch' in request_data:
+            self.waiting_for_move = True
+            self.available_moves = []
+            print("\nForce switch required!")
         
-        elif command == 'turn':
-            if len(parts) >= 3:
-                old_turn = self.turn
-                self.turn = int(parts[2])
-                print(f"\nTurn {old_turn} → {self.turn}")
-                
-                # Every 5 turns, analyze battle trends
-                if self.turn % 5 == 0 and self.turn > 0:
-                    self._analyze_battle_trends()
-                
-                context_updated = True
-
-        elif command == '-heal':
-            # Format: |-heal|POKEMON|HP STATUS
-            if len(parts) >= 4:
-                pokemon = parts[2]
-                new_hp = parts[3]
-                if pokemon.startswith(self.player_id):
-                    # Update our Pokemon's HP
-                    poke_id = pokemon.split(':')[1]
-                    if poke_id in self.my_team:
-                        self.my_team[poke_id]['hp'] = new_hp
-                        context_updated = True
-                else:
-                    # Update opponent's HP
-                    for key in self.opponent_team:
-                        if key in pokemon:
-                            self.opponent_team[key]['hp'] = new_hp
-                            context_updated = True
-
-        elif command == '-status':
-            # Format: |-status|POKEMON|STATUS
-            if len(parts) >= 4:
-                pokemon = parts[2]
-                status = parts[3]
-                if pokemon.startswith(self.player_id):
-                    poke_id = pokemon.split(':')[1]
-                    if poke_id in self.my_team:
-                        self.my_team[poke_id]['status'] = status
-                        context_updated = True
-                else:
-                    # Update opponent's status
-                    for key in self.opponent_team:
-                        if key in pokemon:
-                            self.opponent_team[key]['status'] = status
-                            context_updated = True
-
-        elif command == 'faint':
-            # Format: |faint|POKEMON
-            if len(parts) >= 3:
-                pokemon = parts[2]
-                if pokemon.startswith(self.player_id):
-                    poke_id = pokemon.split(':')[1]
-                    if poke_id in self.my_team:
-                        self.my_team[poke_id]['hp'] = '0 fnt'
-                        context_updated = True
-                else:
-                    # Update opponent's fainted status
-                    for key in self.opponent_team:
-                        if key in pokemon:
-                            self.opponent_team[key]['hp'] = '0 fnt'
-                            context_updated = True
-                    
-        # Handle player identification
-        elif command == 'player':
-            # Format: |player|PLAYER|USERNAME
-            if len(parts) >= 4:
-                player_id = parts[2]
-                username = parts[3]
-                
-                # If this is our username, set player_id
-                if username.lower() == 'slattyslattnu':
-                    self.player_id = player_id
-                    print(f"Player ID set to: {self.player_id} from player command")
-                    context_updated = True
-                
-        # Handle when a Pokemon is sent out
-        elif command == 'drag' or command == 'replace':
-            # Format: |drag|POKEMON|DETAILS|HP STATUS
-            if len(parts) >= 4:
-                pokemon_full = parts[2]
-                details = parts[3]
-                pokemon_name = details.split(',')[0]
-                
-                if pokemon_full.startswith(self.player_id):
-                    self.active_pokemon['self'] = pokemon_name
-                    print(f"Forced switch to: {pokemon_name}")
-                else:
-                    self.active_pokemon['opponent'] = pokemon_name
-                    print(f"Opponent forced to: {pokemon_name}")
-                
-                context_updated = True
+        # Handle available moves
+        if 'active' in request_data and request_data['active']:
+            active_moves = request_data['active'][0].get('moves', [])
+            self.available_moves = [MoveSlot.from_request(move) for move in active_moves]
+            if self.player.active:
+                self.player.active.update_moves(active_moves)
+            
+            # Track if moves are trapped, disabled, etc.
+            for move in self.available_moves:
+                print(f"Move: {move.name} - PP: {move.pp}/{move.max_pp}")
+                if move.disabled:
+                    print(f"  - Disabled: {move.name}")
+                if move.target:
+                    print(f"  - Target type: {move.target}")
+            
+            self.waiting_for_move = True
         
-        # Handle weather changes
-        elif command == '-weather':
-            if len(parts) >= 3:
-                self.weather = parts[2]
-                print(f"Weather changed to: {self.weather}")
-                context_updated = True
+        return True
+
+    def _on_move(self, message):
+        # Format: |move|POKEMON|MOVE|TARGET
+        if len(message.args) < 3:
+            return False
+        user, move, target = message.args[:3]
+        print(f"\nMove used: {user} used {move} on {target}")
         
-        # Handle field condition changes
-        elif command == '-fieldstart' or command == '-fieldend':
-            if len(parts) >= 3:
-                field_condition = parts[2]
-                if command == '-fieldstart':
-                    if field_condition not in self.field_conditions:
-                        self.field_conditions.append(field_condition)
-                    print(f"Field condition started: {field_condition}")
-                else:
-                    if field_condition in self.field_conditions:
-                        self.field_conditions.remove(field_condition)
-                    print(f"Field condition ended: {field_condition}")
-                context_updated = True
+        # If opponent used a move, record it for future analysis
+        if not self._is_player(user):
+            opponent_pokemon = user.split(':')[1].strip() if ':' in user else user
+            pokemon = self.opponent.get(user)
+            
+            # Also update opponent's active Pokemon if not already set
+            if not self.opponent.active:
+                pokemon = pokemon or self.opponent.add(user, opponent_pokemon)
+                self.opponent.set_active(pokemon)
+                print(f"Updated opponent's active Pokemon to: {opponent_pokemon}")
+            
+            # Revealed moves are keyed by species, which differs from the nickname for formes
+            species = pokemon.species if pokemon and pokemon.species else opponent_pokemon
+            self.context_builder.record_opponent_move(species, move)
         
-        # Update the context if any battle state has changed
-        if context_updated and command != 'request':  # We already update for 'request' commands
-            self._update_context_from_battle_state()
+        return True
+
+    def _on_poke(self, message):
+        # Format: |poke|PLAYER|DETAILS|ITEM
+        if len(message.args) < 2:
+            return False
+        player, details = message.args[:2]
+        pokemon_name = details.split(',')[0]
         
-    def _update_context_from_battle_state(self):
-        """Update the context using the current battle state"""
-        # Create a simplified request data structure for context updates
-        simplified_request = {
-            'side': {
-                'id': self.player_id or '',  # Use empty string if player_id is None
-                'pokemon': []
-            },
-            'active': [{'moves': self.available_moves}] if self.available_moves else [],
-            'turn': self.turn,
-            'weather': self.weather or 'none',  # Use 'none' if weather is None
-            'field_conditions': self.field_conditions or []  # Use empty list if field_conditions is None
-        }
+        # If it's opponent's Pokemon, add to opponent team
+        if self._is_player(player):
+            return False
+        # This is the first time we're seeing this Pokemon
+        ident = f"{player}: {pokemon_name}"
+        if self.opponent.get(ident):
+            return False
+        self.opponent.add(ident, details)
+        print(f"Opponent revealed: {pokemon_name}")
+        return True
+
+    def _on_start(self, message):
+        # Set player_id if not already set
+        if self.player_id or not message.args:
+            return False
+        if 'p1' in message.args[0]:
+            self.player_id = 'p1'
+        elif 'p2' in message.args[0]:
+            self.player_id = 'p2'
+        print(f"Player ID set to: {self.player_id}")
+        return True
+
+    def _on_switch(self, message):
+        # Format: |switch|POKEMON|DETAILS|HP STATUS (drag and replace share it)
+        if len(message.args) < 2:
+            return False
+        pokemon_full, details = message.args[:2]
+        hp_status = message.arg(2)
+        pokemon_name = details.split(',')[0]
         
-        # Add our team to the simplified request
-        for pokemon_id, pokemon_data in self.my_team.items():
-            if pokemon_data:  # Check if pokemon_data is not None
-                pokemon_entry = {
-                    'ident': pokemon_id,
-                    'details': pokemon_data.get('name', ''),  # Use get with default value
-                    'condition': pokemon_data.get('hp', '100'),
-                    'active': pokemon_data.get('active', False),
-                    'moves': pokemon_data.get('moves', []),
-                    'baseAbility': pokemon_data.get('baseAbility', ''),
-                    'status': pokemon_data.get('status', '')
-                }
-                simplified_request['side']['pokemon'].append(pokemon_entry)
+        if self._is_player(pokemon_full):
+            pokemon = self.player.get(pokemon_full)
+            if pokemon:
+                self.player.set_active(pokemon)
+            print(f"Switched active Pokemon to: {pokemon_name}")
+        else:
+            # This is the opponent's Pokemon
+            # Switch details are authoritative, so an existing record takes them too
+            pokemon = self.opponent.add(pokemon_full, details)
+            if hp_status:
+                pokemon.set_condition(hp_status)
+            self.opponent.set_active(pokemon)
+            print(f"Opponent switched to: {pokemon_name} with HP {hp_status}")
         
-        # Add opponent information to the context - with null checks
-        opponent_data = {
-            'team': {}
-        }
+        return True
+
+    def _on_condition(self, message):
+        # Format: |-damage|POKEMON|HP STATUS (and -heal)
+        if len(message.args) < 2:
+            return False
+        pokemon, new_hp = message.args[:2]
+        record = self._side_for(pokemon).get(pokemon)
+        if not record:
+            return False
+        record.set_condition(new_hp)
+        print(f"Updated {pokemon}'s HP to {new_hp}")
+        return True
+
+    def _on_status(self, message):
+        # Format: |-status|POKEMON|STATUS
+        if len(message.args) < 2:
+            return False
+        pokemon, status = message.args[:2]
+        record = self._side_for(pokemon).get(pokemon)
+        if not record:
+            return False
+        record.status = Status.parse(status)
+        return True
+
+    def _on_faint(self, message):
+        # Format: |faint|POKEMON
+        if not message.args:
+            return False
+        pokemon = message.args[0]
+        record = self._side_for(pokemon).get(pokemon)
+        if not record:
+            return False
+        record.set_condition('0 fnt')
+        return True
+
+    def _on_turn(self, message):
+        # Format: |turn|NUMBER
+        if not message.args:
+            return False
+        old_turn = self.turn
+        self.turn = int(message.args[0])
+        print(f"\nTurn {old_turn} → {self.turn}")
         
-        # Handle opponent's active Pokémon - could be a string or None
-        active_opponent = self.active_pokemon.get('opponent', None)
-        if active_opponent:
-            if isinstance(active_opponent, dict):
-                opponent_data['active'] = active_opponent
-            else:
-                # If it's a string, create a minimal dictionary with the name
-                opponent_data['active'] = {
-                    'details': active_opponent,
-                    'name': active_opponent
-                }
-        else:
-            opponent_data['active'] = None
+        # Every 5 turns, analyze battle trends
+        if self.turn % 5 == 0 and self.turn > 0:
+            self._analyze_battle_trends()
         
-        # Only add opponent team if it exists
-        if self.opponent_team:
-            opponent_data['team'] = self.opponent_team
+        return True
+
+    def _on_player(self, message):
+        # Format: |player|PLAYER|USERNAME
+        if len(message.args) < 2:
+            return False
+        player_id, username = message.args[:2]
         
-        simplified_request['opponent'] = opponent_data
+        # If this is our username, set player_id
+        if username.lower() != 'slattyslattnu':
+            return False
+        self.player_id = player_id
+        print(f"Player ID set to: {self.player_id} from player command")
+        return True
+
+    def _on_weather(self, message):
+        # Format: |-weather|WEATHER
+        if not message.args:
+            return False
+        self.weather = message.args[0]
+        print(f"Weather changed to: {self.weather}")
+        return True
+
+    def _on_field(self, message):
+        # Format: |-fieldstart|CONDITION (and -fieldend)
+        if not message.args:
+            return False
+        field_condition = message.args[0]
+        if message.command == '-fieldstart':
+            if field_condition not in self.field_conditions:
+                self.field_conditions.append(field_condition)
+            print(f"Field condition started: {field_condition}")
+        else:
+            if field_condition in self.field_conditions:
+                self.field_conditions.remove(field_condition)
+            print(f"Field condition ended: {field_condition}")
+        return True
         
+    def _update_context_from_battle_state(self):
+        """Update the context using the current battle state"""
         try:
-            # Update the context using the context builder
-            self.current_context = self.context_builder.construct_context(simplified_request)
+            # The ContextBuilder reads the same side records we mutate
+            self.current_context = self.context_builder.construct_context(
+                self.player,
+                self.opponent,
+                weather=self.weather,
+                turn=self.turn
+            )
+            self.context_builds += 1
             
-            print("\n=== BATTLE CONTEXT UPDATED (Non-Request) ===")
+            print("\n=== BATTLE CONTEXT UPDATED ===")
             self._print_context_summary()
         except Exception as e:
             print(f"Error updating context: {e}")
-            print(f"Simplified request: {simplified_request}")
 
     def _print_context_summary(self):
         """Print a summary of the current context"""
@@ -423,21 +346,41 @@ class BattleState:
                     print(f"- {option}")
 
     def _analyze_battle_trends(self):
-        """Analyze battle trends using the strategy engine"""
-        if len(self.strategy_engine.get_decision_history()) >= 3:
-            print("\n=== BATTLE TREND ANALYSIS ===")
-            trend_analysis = self.strategy_engine.analyze_battle_trend()
-            print(trend_analysis["analysis"])
-            print("===============================")
+        """Analyze battle trends using the strategy engine, in the background when an event loop is running"""
+        if len(self.strategy_engine.get_decision_history()) < 3:
+            return
+        try:
+            asyncio.get_running_loop().create_task(self._print_battle_trends())
+        except RuntimeError:
+            self._print_trend_analysis(self.strategy_engine.analyze_battle_trend())
+
+    async def _print_battle_trends(self):
+        self._print_trend_analysis(await self.strategy_engine.analyze_battle_trend_async())
+
+    def _print_trend_analysis(self, trend_analysis):
+        print("\n=== BATTLE TREND ANALYSIS ===")
+        print(trend_analysis.get("analysis", trend_analysis.get("status")))
+        print("===============================")
+
+    def start_decision(self, coroutine):
+        """Run a decision as a task so the protocol reader keeps going; supersedes any in-flight one"""
+        self.cancel_decision()
+        self.decision_task = asyncio.create_task(coroutine)
+        return self.decision_task
+
+    def cancel_decision(self):
+        if self.decision_task is not None and not self.decision_task.done():
+            self.decision_task.cancel()
+        self.decision_task = None
 
     def get_battle_state_summary(self):
         """Create a summary of the current battle state for the AI"""
         summary = {
-            'my_active': self.active_pokemon['self'],
-            'opponent_active': self.active_pokemon['opponent'],
-            'my_team': self.my_team,
-            'opponent_team': self.opponent_team,
-            'available_moves': self.available_moves,
+            'my_active': self.player.active.species if self.player.active else None,
+            'opponent_active': self.opponent.active.species if self.opponent.active else None,
+            'my_team': self.player.to_dict()['team'],
+            'opponent_team': self.opponent.to_dict()['team'],
+            'available_moves': [move.to_dict() for move in self.available_moves],
             'weather': self.weather,
             'field_conditions': self.field_conditions,
             'turn': self.turn
@@ -470,7 +413,7 @@ async def handle_user_input(websocket):
         # Send the message to the websocket
         await websocket.send(user_input)
 
-async def handle_battle_flow(ws, battle_state):
+async def handle_battle_flow(ws, router):
     """Handle the complete battle flow: challenge, join, battle, and cleanup"""
     
     # Send challenge
@@ -481,11 +424,18 @@ async def handle_battle_flow(ws, battle_state):
     
     # The rest of the flow will be handled by the message processing in handle_websocket
     # When the challenge is accepted, we'll extract the battle ID and join the room
-    # Then we'll process battle messages and make moves
+    # Then the router opens a session for the room and we make moves in it
+
+def new_battle_session(room):
+    """BattleState for a newly initialized battle room"""
+    battle_state = BattleState()
+    battle_state.battle_id = room
+    return battle_state
 
 async def handle_websocket():
     url = "wss://sim3.psim.us/showdown/websocket"
-    battle_state = BattleState()
+    # One BattleState per battle room, created on |init|battle and dropped when the battle ends
+    router = BattleRouter(new_battle_session)
     
     async with websockets.connect(url) as ws:
         input_task = asyncio.create_task(handle_user_input(ws))
@@ -506,73 +456,58 @@ async def handle_websocket():
                         print("Login command sent")
                         
                         # Start the battle flow after successful login
-                        if not battle_state.battle_id:
-                            await handle_battle_flow(ws, battle_state)
+                        if not router.sessions:
+                            await handle_battle_flow(ws, router)
                         else:
                             print("Already in a battle, not sending challenge")
                     else:
                         print("Login failed")
                 
                 # Handle PM messages with battle links
-                elif "|pm|" in message and "accepted the challenge, starting" in message and "battle-gen9randombattle" in message:
-                    print("Challenge accepted! Extracting battle ID...")
-                    
+                elif "|pm|" in message and "accepted the challenge, starting" in message:
                     # Extract the battle ID using regex
-                    import re
-                    battle_match = re.search(r'battle-gen9randombattle-(\d+)', message)
+                    battle_match = re.search(r'battle-[a-z0-9]+-\d+', message)
                     
-                    if battle_match:
-                        battle_id = f"battle-gen9randombattle-{battle_match.group(1)}"
-                        battle_state.battle_id = battle_id
-                        print(f"Extracted battle ID: {battle_id}")
+                    if battle_match and not router.get(battle_match.group(0)):
+                        battle_id = battle_match.group(0)
+                        print(f"Challenge accepted! Joining battle room: {battle_id}")
                         
-                        # Explicitly join the battle room
-                        join_command = f"|/join {battle_id}"
-                        await ws.send(join_command)
-                        print(f"Joining battle room: {battle_id}")
+                        # Explicitly join the battle room; its |init|battle opens the session
+                        await ws.send(f"|/join {battle_id}")
                 
-                # Handle room-specific messages
-                elif battle_state.battle_id and message.startswith(f">{battle_state.battle_id}\n"):
-                    # This is a message for our battle room
-                    # Strip the room prefix and process the actual message content
-                    room_message = message.split("\n", 1)[1] if "\n" in message else ""
-                    if room_message:
-                        battle_state.update_from_message(room_message)
-                        
-                        # If we need to make a move, get AI recommendation
-                        if battle_state.waiting_for_move and battle_state.active_pokemon['opponent']:
-                            action_command = await recommend_move(battle_state)
-                            if action_command:
-                                # Send the command to the specific battle room
-                                room_command = f"{battle_state.battle_id}{action_command}"
-                                await ws.send(room_command)
-                                print(f"AI recommended and used action: {action_command}")
-                                battle_state.waiting_for_move = False
-                
-                # Handle other messages
+                # Room frames go to that room's session
                 else:
-                        
-                    battle_state.update_from_message(message)
+                    room, battle_state, ended = router.route(message)
+                    if ended:
+                        battle_state.cancel_decision()
+                        await ws.send(f"|/leave {room}")
+                        continue
                     
-                    # If we need to make a move, get AI recommendation
-                    if battle_state.waiting_for_move and battle_state.opponent_team:
-                        print("We are abt to recommend, and we have an opponent team", battle_state.opponent_team)
-                        action_command = await recommend_move(battle_state)
-                        if action_command:
-                            # Add battle ID prefix to ensure command is sent to the correct room
-                            if battle_state.battle_id:
-                                room_command = f"{battle_state.battle_id}{action_command}"
-                                await ws.send(room_command)
-                            else:
-                                await ws.send(action_command)  # Fallback if no battle ID (shouldn't happen)
-                            print(f"AI recommended and used action: {action_command}")
-                            battle_state.waiting_for_move = False
+                    # If we need to make a move, get AI recommendation without blocking other rooms
+                    if battle_state and battle_state.waiting_for_move and battle_state.opponent.pokemon:
+                        battle_state.waiting_for_move = False
+                        battle_state.start_decision(play_decision(ws, battle_state))
             except websockets.exceptions.ConnectionClosed:
                 print("Connection closed")
                 break
             
         input_task.cancel()
 
+async def play_decision(ws, battle_state):
+    """Get a recommendation for one battle and send it to that battle's room"""
+    try:
+        action_command = await recommend_move(battle_state)
+    except asyncio.CancelledError:
+        print(f"Decision for {battle_state.battle_id} cancelled")
+        raise
+    except Exception as e:
+        print(f"Error making decision for {battle_state.battle_id}: {e}")
+        return
+    if action_command:
+        # Send the command to the specific battle room
+        await ws.send(f"{battle_state.battle_id}{action_command}")
+        print(f"AI recommended and used action: {action_command}")
+
 async def recommend_move(battle_state):
     print("\n=== RECOMMENDING ACTION ===")
     
@@ -581,20 +516,22 @@ async def recommend_move(battle_state):
     
     # Get available switches (exclude fainted Pokémon)
     available_switches = []
-    for index, (pos, pokemon) in enumerate(battle_state.my_team.items(), start=1):
-        if not pokemon['active'] and 'fnt' not in pokemon['hp']:
+    for index, pokemon in enumerate(battle_state.player.team, start=1):
+        if not pokemon.active and not pokemon.fainted:
             available_switches.append(index)
     
     print(f"Must switch: {must_switch}")
     print(f"Available switches: {available_switches}")
-    print(f"Available moves: {[move['move'] for move in battle_state.available_moves]}")
+    print(f"Available moves: {[move.name for move in battle_state.available_moves]}")
     
     if must_switch and not available_switches:
         print("ERROR: Must switch but no available switches!")
         return None
     
-    # Use the BattleStrategy to make a decision based on context
-    decision = battle_state.strategy_engine.make_decision(battle_state.current_context)
+    # Use the BattleStrategy to make a decision based on context; building it
+    # can block on embeddings/Chroma, so it runs off the event loop
+    context = await asyncio.to_thread(battle_state.ensure_context)
+    decision = await battle_state.strategy_engine.make_decision_async(context)
     
     # Print the decision explanation
     explanation = battle_state.strategy_engine.explain_decision(decision)
@@ -611,9 +548,9 @@ async def recommend_move(battle_state):
         # Find the move index in available_moves
         if not must_switch:
             for i, move in enumerate(battle_state.available_moves, 1):
-                if move["move"].lower() == target.lower():
+                if move.name.lower() == target.lower():
                     command = f"|/choose move {i}"
-                    print(f"Found matching move: {move['move']} at index {i}")
+                    print(f"Found matching move: {move.name} at index {i}")
                     break
             
             # If exact move not found, use the first available move
@@ -623,9 +560,9 @@ async def recommend_move(battle_state):
     
     elif action == "switch":
         # Find the Pokemon index in available_switches
-        for index, (pos, pokemon) in enumerate(battle_state.my_team.items(), start=1):
-            if not pokemon['active'] and 'fnt' not in pokemon['hp']:
-                pokemon_name = pokemon['name'].split(',')[0]
+        for index, pokemon in enumerate(battle_state.player.team, start=1):
+            if not pokemon.active and not pokemon.fainted:
+                pokemon_name = pokemon.species
                 if pokemon_name.lower() == target.lower():
                     if index in available_switches:
                         command = f"|/choose switch {index}"
@@ -0,0 +1,310 @@
+import copy
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, List, Optional, Tuple
+
+from name_resolver import to_id
+
+
+class Status(str, Enum):
+    """Major status conditions as they appear in Showdown condition strings"""
+    NONE = ""
+    BURN = "brn"
+    PARALYSIS = "par"
+    SLEEP = "slp"
+    FREEZE = "frz"
+    POISON = "psn"
+    TOXIC = "tox"
+    FAINTED = "fnt"
+
+    @classmethod
+    def parse(cls, value) -> "Status":
+        try:
+            return cls((value or "").strip().lower())
+        except ValueError:
+            return cls.NONE
+
+
+def parse_condition(condition) -> Tuple[Optional[int], Optional[int], Status]:
+    """Split a condition like "74/100 par", "0 fnt" or "100" into (hp, max_hp, status)"""
+    tokens = str(condition).split()
+    if not tokens:
+        return None, None, Status.NONE
+    status = Status.parse(tokens[1]) if len(tokens) > 1 else Status.NONE
+    current, _, maximum = tokens[0].partition("/")
+    try:
+        hp = int(float(current))
+        max_hp = int(maximum) if maximum else None
+    except ValueError:
+        return None, None, status
+    return hp, max_hp, status
+
+
+def ident_key(ident) -> Tuple[str, str]:
+    """
+    Canonical key for a protocol ident: ("p2", "garchomp") for "p2a: Garchomp",
+    "p2: Garchomp" and "p2b: Garchomp" alike. The position letter is dropped
+    so active-slot idents and request/poke idents land on the same record.
+    """
+    side, sep, name = str(ident).partition(":")
+    if not sep:
+        return ("", to_id(side))
+    return (side.strip()[:2], to_id(name))
+
+
+def canonical_ident(ident) -> str:
+    """Ident without the position letter: "p2a: Garchomp" -> "p2: Garchomp" """
+    side, sep, name = str(ident).partition(":")
+    return f"{side.strip()[:2]}: {name.strip()}" if sep else str(ident).strip()
+
+
+@dataclass(slots=True)
+class MoveSlot:
+    """One of a Pokemon's moves, with the PP and disabled state from requests"""
+    id: str
+    name: str
+    pp: Optional[int] = None
+    max_pp: Optional[int] = None
+    disabled: bool = False
+    target: str = ""
+
+    @classmethod
+    def from_request(cls, move) -> "MoveSlot":
+        """Side requests list move IDs; active requests list move dicts with PP"""
+        if isinstance(move, dict):
+            name = move.get("move") or move.get("id") or ""
+            return cls(
+                id=move.get("id") or to_id(name),
+                name=name,
+                pp=move.get("pp"),
+                max_pp=move.get("maxpp"),
+                disabled=bool(move.get("disabled", False)),
+                target=move.get("target", "")
+            )
+        return cls(id=to_id(move), name=str(move))
+
+    def update(self, move):
+        """Refresh PP, disabled state and display name from an active request entry"""
+        self.name = move.get("move") or self.name
+        self.pp = move.get("pp", self.pp)
+        self.max_pp = move.get("maxpp", self.max_pp)
+        self.disabled = bool(move.get("disabled", False))
+        self.target = move.get("target", self.target)
+
+    def to_dict(self) -> Dict:
+        return {"move": self.name, "id": self.id, "pp": self.pp, "maxpp": self.max_pp, "disabled": self.disabled}
+
+
+@dataclass(slots=True)
+class PokemonState:
+    """
+    One Pokemon on either side, mutated in place by the protocol handlers.
+
+    HP is parsed once into integers (the opponent's is out of 100) and the
+    status is a Status member, so readers never re-parse condition strings.
+    """
+    ident: str
+    details: str = ""
+    species: str = ""
+    species_id: str = ""
+    level: int = 100
+    hp: int = 100
+    max_hp: int = 100
+    status: Status = Status.NONE
+    active: bool = False
+    moves: List[MoveSlot] = field(default_factory=list)
+    stats: Dict[str, int] = field(default_factory=dict)
+    ability: str = ""
+    item: str = ""
+
+    def __post_init__(self):
+        if self.details:
+            details, self.details = self.details, ""
+            self.set_details(details)
+
+    def set_details(self, details):
+        """Parse a details string like "Slowking-Galar, L84, F" into species and level"""
+        if not details or details == self.details:
+            return
+        self.details = details
+        parts = [part.strip() for part in details.split(",")]
+        self.species = parts[0]
+        self.species_id = to_id(parts[0])
+        self.level = 100
+        for part in parts[1:]:
+            if part[:1] == "L" and part[1:].isdigit():
+                self.level = int(part[1:])
+
+    def set_condition(self, condition):
+        """Apply a condition string from a request or a -damage/-heal/faint line"""
+        hp, max_hp, status = parse_condition(condition)
+        if hp is None:
+            return
+        self.hp = hp
+        if max_hp:
+            self.max_hp = max_hp
+        self.status = status
+
+    def set_moves(self, moves):
+        """Replace the move slots, keeping the existing ones when the moveset is unchanged"""
+        ids = [to_id(move.get("id") or move.get("move", "")) if isinstance(move, dict) else to_id(move) for move in moves]
+        if ids != [slot.id for slot in self.moves]:
+            self.moves = [MoveSlot.from_request(move) for move in moves]
+
+    def update_moves(self, moves):
+        """Refresh PP and disabled state from an active request's move list"""
+        slots = {slot.id: slot for slot in self.moves}
+        for move in moves:
+            slot = slots.get(move.get("id") or to_id(move.get("move", "")))
+            if slot is not None:
+                slot.update(move)
+
+    @property
+    def fainted(self) -> bool:
+        return self.hp <= 0 or self.status is Status.FAINTED
+
+    @property
+    def hp_fraction(self) -> float:
+        return self.hp / self.max_hp if self.max_hp else 0.0
+
+    @property
+    def hp_percent(self) -> int:
+        return round(100 * self.hp_fraction)
+
+    @property
+    def move_ids(self) -> Tuple[str, ...]:
+        return tuple(slot.id for slot in self.moves)
+
+    @property
+    def key(self) -> Tuple[str, Tuple[str, ...]]:
+        """Identity for dependency tracking: species and moves, not HP"""
+        return (self.species_id, self.move_ids)
+
+    def copy(self) -> "PokemonState":
+        clone = copy.copy(self)
+        clone.moves = [copy.copy(slot) for slot in self.moves]
+        return clone
+
+    def to_dict(self) -> Dict:
+        return {
+            "ident": self.ident,
+            "details": self.details,
+            "hp": self.hp_percent,
+            "condition": f"{self.hp}/{self.max_hp}" + (f" {self.status.value}" if self.status else ""),
+            "status": self.status.value or None,
+            "active": self.active,
+            "moves": [slot.name for slot in self.moves]
+        }
+
+
+@dataclass(slots=True)
+class SideState:
+    """
+    A player's side: their Pokemon in request order, the active one and side conditions.
+
+    `pokemon` is keyed by canonical ident ("p2: Garchomp"); `index` maps
+    ident_key tuples to the same records, so any ident form resolves in O(1).
+    """
+    id: str = ""
+    pokemon: Dict[str, PokemonState] = field(default_factory=dict)
+    active_ident: Optional[str] = None
+    side_conditions: Dict[str, int] = field(default_factory=dict)
+    index: Dict[Tuple[str, str], PokemonState] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.pokemon and not self.index:
+            self._reindex()
+
+    def _reindex(self):
+        self.index = {ident_key(ident): pokemon for ident, pokemon in self.pokemon.items()}
+
+    @property
+    def active(self) -> Optional[PokemonState]:
+        return self.pokemon.get(self.active_ident) if self.active_ident else None
+
+    @property
+    def team(self) -> List[PokemonState]:
+        return list(self.pokemon.values())
+
+    def get(self, ident) -> Optional[PokemonState]:
+        """Record for any form of an ident ("p2a: Name", "p2: Name")"""
+        return self.index.get(ident_key(ident))
+
+    def add(self, ident, details="") -> PokemonState:
+        """Return the Pokemon for an ident, creating it the first time it is seen"""
+        key = ident_key(ident)
+        pokemon = self.index.get(key)
+        if pokemon is None:
+            # Team preview names the species ("p2: Rotom-Wash"), switches the nickname ("p2a: Rotom")
+            pokemon = self._match_species(key[0], details)
+            if pokemon is not None:
+                self.index[key] = pokemon
+        if pokemon is None:
+            ident = canonical_ident(ident)
+            pokemon = self.pokemon[ident] = self.index[key] = PokemonState(ident=ident, details=details)
+        else:
+            pokemon.set_details(details)
+        return pokemon
+
+    def _match_species(self, side, details) -> Optional[PokemonState]:
+        """Existing record on a side for the species in a details string, including "Urshifu-*" previews"""
+        species = details.split(",")[0].strip()
+        if not species:
+            return None
+        species_id = to_id(species)
+        for pokemon in self.pokemon.values():
+            if ident_key(pokemon.ident)[0] != side:
+                continue
+            if pokemon.species_id == species_id:
+                return pokemon
+            if pokemon.species.endswith("*") and to_id(species).startswith(to_id(pokemon.species)):
+                return pokemon
+        return None
+
+    def set_active(self, pokemon: Optional[PokemonState]):
+        current = self.active
+        if current is not None:
+            current.active = False
+        self.active_ident = pokemon.ident if pokemon else None
+        if pokemon is not None:
+            pokemon.active = True
+
+    def apply_request(self, side_data):
+        """Update the side in place from a request's "side" object"""
+        if side_data.get("id"):
+            self.id = side_data["id"]
+        # Request order is the switch order, so the dict is reordered but records are reused
+        ordered = {}
+        active = None
+        for entry in side_data.get("pokemon", []):
+            pokemon = self.get(entry["ident"]) or PokemonState(ident=canonical_ident(entry["ident"]))
+            pokemon.set_details(entry.get("details", ""))
+            pokemon.set_condition(entry.get("condition", ""))
+            pokemon.set_moves(entry.get("moves", []))
+            pokemon.stats = entry.get("stats", pokemon.stats)
+            pokemon.ability = entry.get("baseAbility", pokemon.ability)
+            pokemon.item = entry.get("item", pokemon.item)
+            pokemon.active = bool(entry.get("active", False))
+            if pokemon.active:
+                active = pokemon
+            ordered[pokemon.ident] = pokemon
+        self.pokemon = ordered
+        self._reindex()
+        self.active_ident = active.ident if active else None
+
+    def copy(self) -> "SideState":
+        return SideState(
+            id=self.id,
+            pokemon={ident: pokemon.copy() for ident, pokemon in self.pokemon.items()},
+            active_ident=self.active_ident,
+            side_conditions=dict(self.side_conditions)
+        )
+
+    def to_dict(self) -> Dict:
+        active = self.active
+        return {
+            "id": self.id,
+            "active": active.to_dict() if active else None,
+            "team": [pokemon.to_dict() for pokemon in self.pokemon.values()],
+            "side_conditions": dict(self.side_conditions)
+        }
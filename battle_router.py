@@ -0,0 +1,57 @@
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+from showdown_protocol import ProtocolMessage, parse_frame
+
+# Commands that end a battle; the room's session is dropped after applying them
+END_COMMANDS = frozenset({"win", "tie", "deinit"})
+
+
+class BattleRouter:
+    """
+    Multiplexes battle rooms over one connection: room ID -> battle session.
+
+    A session is created when a room sends `|init|battle`, receives every
+    later frame for that room, and is dropped on `|win|`, `|tie|` or
+    `|deinit|`. Sessions are whatever `session_factory(room)` returns and
+    must provide `apply_messages(messages)`.
+    """
+
+    def __init__(self, session_factory: Callable[[str], object], finished_history=100):
+        self.session_factory = session_factory
+        self.sessions: Dict[str, object] = {}
+        # Most recently ended rooms, bounded for long-running ladder processes
+        self.finished: Deque[str] = deque(maxlen=finished_history)
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def get(self, room) -> Optional[object]:
+        return self.sessions.get(room)
+
+    def route(self, frame):
+        """
+        Apply a frame to its room's session. Returns (room, session, ended);
+        session is None for global frames and rooms without a session.
+        """
+        messages: List[ProtocolMessage] = list(parse_frame(frame))
+        room = messages[0].room if messages else ""
+        if not room:
+            return room, None, False
+
+        commands = {message.command for message in messages}
+        session = self.sessions.get(room)
+        if session is None and any(message.command == "init" and message.arg(0) == "battle" for message in messages):
+            session = self.sessions[room] = self.session_factory(room)
+            print(f"Battle session opened: {room} ({len(self.sessions)} active)")
+        if session is None:
+            return room, None, False
+
+        session.apply_messages(messages)
+
+        ended = not commands.isdisjoint(END_COMMANDS)
+        if ended:
+            del self.sessions[room]
+            self.finished.append(room)
+            print(f"Battle session closed: {room} ({len(self.sessions)} active)")
+        return room, session, ended
@@ -1,111 +1,100 @@
-from langchain_chroma import Chroma
-from uuid import uuid4
-from langchain_openai import OpenAI
-from langchain_openai.embeddings import OpenAIEmbeddings
-from langchain_core.documents import Document
-from langchain_community.document_loaders import DirectoryLoader
-from langchain_community.document_loaders import CSVLoader
-import os
 import json
-from dotenv import load_dotenv
-load_dotenv()
+from move_index import move_name
+from knowledge_base import get_knowledge_base
+from memo import MemoScope
+from lazy_context import LazyContext
+from species_index import to_id
+from battle_records import SideState, Status
+from matchup_matrix import MatchupMatrix
+from damage_calc import Combatant, DamageCalculator, STAT_KEYS, compute_stats
+from speed_tiers import SPEED_VARIANTS
+from turn_timeline import TurnTimeline
 
-with open("gen9randombattle.json") as f:
-    rand_bats = json.load(f)
+# Move ranking score for each combined type multiplier
+EFFECTIVENESS_SCORES = {
+    4.0: 4,     # Double super effective
+    2.0: 2,     # Super effective
+    1.0: 0,
+    0.5: -1,    # Not very effective
+    0.25: -2,   # Double not very effective
+    0.0: -5     # No effect
+}
 
-#load meta movesets
-json_documents = []
-for pokemon_name, pokemon_data in rand_bats.items():
-    # Create a document with the Pokemon name and its data
-    doc_content = {pokemon_name: pokemon_data}
-    json_documents.append(Document(page_content=json.dumps(doc_content)))
-#load typing matchups
-typing_matchups = CSVLoader("typing_chart.csv")
-typing_matchups = typing_matchups.load()
-typing_matchups = [Document(page_content=i.page_content) for i in typing_matchups]
-#load pokedex information
-pokedex_information = CSVLoader("pokedex.csv")
-pokedex_information = pokedex_information.load() 
-pokedex_information = [Document(page_content=i.page_content) for i in pokedex_information]
+def hp_fraction(pokemon):
+    """Fraction of HP left for a PokemonState, full when unknown"""
+    return pokemon.hp_fraction if pokemon else 1.0
+
+def pokemon_key(pokemon):
+    """Identity of a Pokemon for dependency tracking: species and moves, not HP"""
+    return pokemon.key if pokemon else None
 
 class ContextBuilder:
     def __init__(self):
-        self.pokedex = Chroma(
-            embedding_function=OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY")),
-            collection_name = "Pokemon-Information",
-        )
-        self.meta_db = Chroma(
-            embedding_function=OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY")),
-            collection_name="Common-Movesets"
-        )
-        self.typing_matchups = Chroma(
-            embedding_function=OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY")),
-            collection_name="Typing-Matchups"
-        )
-        self.meta_db.add_documents(json_documents)
-        self.pokedex.add_documents(pokedex_information)
-        self.typing_matchups.add_documents(typing_matchups)
-        self.context = {}
+        # Reference data is shared by every ContextBuilder in the process
+        self.knowledge = get_knowledge_base()
+        # Sides are the SideState records owned by BattleState, shared rather than copied
         self.battle_state = {
-            "player": {
-                "active": None,
-                "team": [],
-                "side_conditions": {}
-            },
-            "opponent": {
-                "active": None,
-                "team": [],
-                "side_conditions": {}
-            },
+            "player": SideState(),
+            "opponent": SideState(),
             "weather": None,
             "terrain": None,
             "turn": 0
         }
-        self.battle_history = []
+        # One entry per turn in a fixed-size ring buffer, last 20 turns
+        self.timeline = TurnTimeline(capacity=20)
         self.revealed_opponent_moves = {}  # Track opponent's revealed moves by Pokemon
+        self.revealed_move_types = {}  # Types of those moves, resolved once per reveal
         
-        # Parse and load the typing chart
-        self.type_chart = self._parse_typing_chart("typing_chart.csv")
+        # Shared compiled typing chart and exact-match indexes
+        self.type_chart = self.knowledge.type_chart
+        self.species_index = self.knowledge.species_index
+        self.move_index = self.knowledge.move_index
+        self.randbats_index = self.knowledge.randbats_index
+        self.speed_tiers = self.knowledge.speed_tiers
         
-    def _parse_typing_chart(self, csv_path):
-        """Parse the typing chart CSV into a dictionary for quick lookups"""
-        type_chart = {}
-        try:
-            with open(csv_path, 'r') as f:
-                lines = f.readlines()
-                
-                # Get the types from the header row
-                types = [t.strip() for t in lines[0].split(',')[1:]]
-                
-                # Parse each row
-                for i in range(1, len(lines)):
-                    row = lines[i].split(',')
-                    attacking_type = row[0].strip()
-                    type_chart[attacking_type] = {}
-                    
-                    # Parse effectiveness values for each defending type
-                    for j, defending_type in enumerate(types):
-                        if j < len(row) - 1:
-                            value = row[j+1].strip()
-                            if value:  # Only add if there's a value
-                                type_chart[attacking_type][defending_type] = value
-            
-            return type_chart
-        except Exception as e:
-            print(f"Error parsing typing chart: {e}")
-            return {}
+        # Static facts live for the battle, derived facts for a single build
+        self.battle_memo = MemoScope("battle")
+        self.build_memo = MemoScope("build")
+        
+        # Analysis sections keyed by the inputs they were computed from
+        self._sections = {}
+        self.section_stats = {}
+        self._history_version = 0
+        
+        # Per-side team totals, extended member by member as the roster grows
+        self._team_totals = {}
+        
+        # Pairwise opponent x player scores, rows added as opponents are revealed
+        self.matchups = MatchupMatrix(self.type_chart)
+        self._matchup_team = None
+        
+        self.damage_calculator = DamageCalculator(self.type_chart)
+    
+    @property
+    def pokedex(self):
+        return self.knowledge.pokedex
+    
+    @property
+    def meta_db(self):
+        return self.knowledge.meta_db
     
-    def construct_context(self, parsed_state):
+    @property
+    def typing_matchups(self):
+        return self.knowledge.typing_matchups
+        
+    def construct_context(self, player, opponent, weather=None, terrain=None, turn=0):
         """Main method to build context from the current game state"""
-        # Update the basic context
-        context = {}
-        context["active"] = parsed_state.get("active", [])
-        print(context["active"])
-        context["pokemon"] = parsed_state.get("side", {}).get("pokemon", [])
-        self.context = context
+        # Derived analyses depend on the state we are about to apply
+        self.build_memo.clear()
+        
+        # Point the battle state at the live side records
+        self._update_battle_state(player, opponent, weather, terrain, turn)
+        
+        # Resolve any names the exact-match indexes miss in one batched lookup
+        self._prefetch_unresolved_names()
         
-        # Update battle state with more detailed information
-        self._update_battle_state(parsed_state)
+        # Add newly revealed opponents to the matchup matrix and mask fainted ones
+        self._sync_matchups()
         
         # Record state in history
         self._record_battle_state()
@@ -113,235 +102,179 @@ class ContextBuilder:
         # Build comprehensive context with analysis
         return self._build_comprehensive_context()
     
-    def _update_battle_state(self, parsed_state):
-        """Update internal battle state from parsed game state"""
-        # Update player's active Pokemon
-        if "active" in parsed_state and parsed_state["active"]:
-            active_data = parsed_state["active"][0]
-            
-            # If details is not in the active data, try to find it from the team
-            if "details" not in active_data and "side" in parsed_state and "pokemon" in parsed_state["side"]:
-                for pokemon in parsed_state["side"]["pokemon"]:
-                    if pokemon.get("active", False):
-                        active_data["details"] = pokemon["details"]
-                        break
-            
-            self.battle_state["player"]["active"] = active_data
-            print(f"Updated player's active Pokemon in battle state: {active_data.get('details', 'Unknown')}")
-        
-        # Update player's team
-        if "side" in parsed_state and "pokemon" in parsed_state["side"]:
-            self.battle_state["player"]["team"] = parsed_state["side"]["pokemon"]
-            
-        # Update side conditions if available
-        if "side" in parsed_state and "conditions" in parsed_state["side"]:
-            self.battle_state["player"]["side_conditions"] = parsed_state["side"]["conditions"]
-            
-        # Update opponent's active Pokemon if available
-        if "opponent" in parsed_state and "active" in parsed_state["opponent"]:
-            self.battle_state["opponent"]["active"] = parsed_state["opponent"]["active"]
-            
-            # Check if active is a string or a dictionary
-            active_opponent = parsed_state["opponent"]["active"]
-            if isinstance(active_opponent, dict):
-                details = active_opponent.get('details', 'Unknown')
-            else:
-                # If it's a string, use it directly
-                details = active_opponent
-                
-            print(f"Updated opponent's active Pokemon in battle state: {details}")
-            
-        # Update opponent's team if available
-        if "opponent" in parsed_state and "pokemon" in parsed_state["opponent"]:
-            self.battle_state["opponent"]["team"] = parsed_state["opponent"]["pokemon"]
-            
-        # Update opponent's side conditions if available
-        if "opponent" in parsed_state and "conditions" in parsed_state["opponent"]:
-            self.battle_state["opponent"]["side_conditions"] = parsed_state["opponent"]["conditions"]
-            
-        # Update field conditions
-        if "weather" in parsed_state:
-            self.battle_state["weather"] = parsed_state["weather"]
-            
-        if "terrain" in parsed_state:
-            self.battle_state["terrain"] = parsed_state["terrain"]
-            
-        if "turn" in parsed_state:
-            self.battle_state["turn"] = parsed_state["turn"]
+    def _update_battle_state(self, player, opponent, weather, terrain, turn):
+        """Update internal battle state from the shared side records"""
+        self.battle_state["player"] = player
+        self.battle_state["opponent"] = opponent
+        self.battle_state["weather"] = weather
+        self.battle_state["terrain"] = terrain
+        self.battle_state["turn"] = turn
+        
+        player_active = player.active
+        opponent_active = opponent.active
+        print(f"Updated player's active Pokemon in battle state: {player_active.details if player_active else 'Unknown'}")
+        print(f"Updated opponent's active Pokemon in battle state: {opponent_active.details if opponent_active else 'Unknown'}")
     
     def _record_battle_state(self):
-        """Record current battle state in history"""
-        # Create a snapshot of the current state
-        current_turn = self.battle_state.get("turn", 0)
+        """Record the current turn in the timeline, replacing this turn's entry if it changed"""
+        player_active = self.battle_state["player"].active
+        opponent_active = self.battle_state["opponent"].active
         
         # Only record if we have active Pokemon information
-        if self.battle_state["player"]["active"] or self.battle_state["opponent"]["active"]:
-            # Create a simplified snapshot to avoid storing too much data
-            snapshot = {
-                "turn": current_turn,
-                "player_active": self._get_pokemon_snapshot(self.battle_state["player"]["active"]),
-                "opponent_active": self._get_pokemon_snapshot(self.battle_state["opponent"]["active"]),
-                "weather": self.battle_state["weather"],
-                "terrain": self.battle_state["terrain"]
-            }
-            
-            # Add to history
-            self.battle_history.append(snapshot)
-            
-            # Limit history size to prevent memory issues
-            if len(self.battle_history) > 20:  # Keep last 20 turns
-                self.battle_history = self.battle_history[-20:]
+        if not (player_active or opponent_active):
+            return
+        changed = self.timeline.record(
+            self.battle_state.get("turn", 0),
+            player=self._get_pokemon_snapshot(player_active),
+            opponent=self._get_pokemon_snapshot(opponent_active),
+            weather=self.battle_state["weather"],
+            terrain=self.battle_state["terrain"]
+        )
+        if changed:
+            self._history_version += 1
     
-    def _get_pokemon_snapshot(self, pokemon_data):
-        """Create a simplified snapshot of Pokemon data"""
-        if not pokemon_data:
+    def _get_pokemon_snapshot(self, pokemon):
+        """(species, hp percent, status) for a timeline entry"""
+        if not pokemon:
             return None
-            
-        return {
-            "name": pokemon_data.get("details", "").split(",")[0],
-            "hp": pokemon_data.get("hp", 100),
-            "status": pokemon_data.get("status", None)
-        }
+        return (pokemon.species, pokemon.hp_percent, pokemon.status.value or None)
     
     def record_opponent_move(self, pokemon_name, move_name):
         """Record a move used by opponent's Pokemon"""
+        pokemon_name = pokemon_name.strip()
         if pokemon_name not in self.revealed_opponent_moves:
             self.revealed_opponent_moves[pokemon_name] = set()
             
+        if move_name in self.revealed_opponent_moves[pokemon_name]:
+            return
         self.revealed_opponent_moves[pokemon_name].add(move_name)
+        record = self._resolve_move(move_name)
+        if record:
+            self.revealed_move_types.setdefault(pokemon_name, set()).add(record.type)
+        self._history_version += 1
+        
+        # Predictions for this species were conditioned on the old reveals
+        self.battle_memo.invalidate("predicted", to_id(pokemon_name))
+        self.battle_memo.invalidate("opponent_member", to_id(pokemon_name))
     
-    def _build_comprehensive_context(self):
-        """Build comprehensive context with all relevant battle information"""
-        comprehensive_context = {
-            "battle_state": self.battle_state,
-            "battle_history": self._analyze_battle_history(),
-            "analysis": {
-                "player_team": self._analyze_team(self.battle_state["player"]["team"], is_player=True),
-                "opponent_team": self._analyze_team(self.battle_state["opponent"]["team"], is_player=False),
-                "current_matchup": self._analyze_current_matchup(),
-                "field_effects": self._analyze_field_effects(),
-                "strategic_options": self._generate_strategic_options()
-            }
+    def memo_stats(self):
+        """Hit/miss counters for the battle and build memo scopes"""
+        return {
+            "battle": self.battle_memo.stats(),
+            "build": self.build_memo.stats(),
+            "sections": {name: dict(counts) for name, counts in self.section_stats.items()}
         }
+    
+    def _section(self, name, inputs, compute):
+        """Return a cached analysis section, recomputing it only when its inputs changed"""
+        counts = self.section_stats.setdefault(name, {"recomputed": 0, "reused": 0})
+        cached = self._sections.get(name)
+        if cached is not None and cached[0] == inputs:
+            counts["reused"] += 1
+            return cached[1]
+        counts["recomputed"] += 1
+        value = compute()
+        self._sections[name] = (inputs, value)
+        return value
+    
+    def _matchup_inputs(self):
+        """The matchup depends on the two actives and what the opponent has revealed"""
+        opponent_key = pokemon_key(self.battle_state["opponent"].active)
+        revealed = ()
+        if opponent_key:
+            for name, moves in self.revealed_opponent_moves.items():
+                if to_id(name) == opponent_key[0]:
+                    revealed = tuple(sorted(moves))
+        statuses = tuple(
+            pokemon.status if pokemon else None
+            for pokemon in (self.battle_state["player"].active, self.battle_state["opponent"].active)
+        )
+        return (pokemon_key(self.battle_state["player"].active), opponent_key, revealed, statuses)
+    
+    def _field_inputs(self):
+        """Field effects depend on weather, terrain and both sides' conditions"""
+        return (
+            self.battle_state["weather"],
+            self.battle_state["terrain"],
+            json.dumps(self.battle_state["player"].side_conditions, sort_keys=True, default=str),
+            json.dumps(self.battle_state["opponent"].side_conditions, sort_keys=True, default=str)
+        )
+    
+    def _active_hp(self):
+        return (
+            hp_fraction(self.battle_state["player"].active),
+            hp_fraction(self.battle_state["opponent"].active)
+        )
+    
+    def _build_comprehensive_context(self):
+        """Build comprehensive context with all relevant battle information, computed on access"""
+        analysis = LazyContext({
+            "player_team": lambda: self._analyze_team(self.battle_state["player"].team, True),
+            "opponent_team": lambda: self._analyze_team(self.battle_state["opponent"].team, False),
+            "current_matchup": self._analyze_current_matchup,
+            "field_effects": self._analyze_field_effects,
+            "damage_estimates": self.estimate_damage,
+            "strategic_options": lambda: self._section(
+                "strategic_options",
+                (self._matchup_inputs(), self._active_hp(), self._field_inputs()),
+                self._generate_strategic_options
+            )
+        })
+        comprehensive_context = LazyContext({
+            "battle_state": self._battle_state_view,
+            "battle_history": lambda: self._section(
+                "battle_history", self._history_version, self._analyze_battle_history
+            ),
+            "analysis": lambda: analysis
+        })
         return comprehensive_context
     
+    def _battle_state_view(self):
+        """Plain-dict view of the battle state for prompts and serialization"""
+        return dict(
+            self.battle_state,
+            player=self.battle_state["player"].to_dict(),
+            opponent=self.battle_state["opponent"].to_dict()
+        )
+    
     def _analyze_battle_history(self):
         """Analyze battle history for patterns and insights"""
-        if not self.battle_history:
+        if not len(self.timeline):
             return {"status": "No history available"}
-            
-        # Extract opponent's Pokemon usage
-        opponent_pokemon_usage = {}
-        for snapshot in self.battle_history:
-            opponent_active = snapshot.get("opponent_active")
-            if opponent_active and opponent_active.get("name"):
-                pokemon_name = opponent_active.get("name")
-                if pokemon_name in opponent_pokemon_usage:
-                    opponent_pokemon_usage[pokemon_name] += 1
-                else:
-                    opponent_pokemon_usage[pokemon_name] = 1
         
-        # Analyze HP trends
-        hp_trends = []
-        for i in range(1, len(self.battle_history)):
-            prev = self.battle_history[i-1]
-            curr = self.battle_history[i]
-            
-            player_hp_change = 0
-            opponent_hp_change = 0
-            
-            # Calculate player HP change
-            prev_player = prev.get("player_active", {})
-            curr_player = curr.get("player_active", {})
-            if prev_player and curr_player and prev_player.get("name") == curr_player.get("name"):
-                player_hp_change = curr_player.get("hp", 0) - prev_player.get("hp", 0)
-            
-            # Calculate opponent HP change
-            prev_opponent = prev.get("opponent_active", {})
-            curr_opponent = curr.get("opponent_active", {})
-            if prev_opponent and curr_opponent and prev_opponent.get("name") == curr_opponent.get("name"):
-                opponent_hp_change = curr_opponent.get("hp", 0) - prev_opponent.get("hp", 0)
-            
-            hp_trends.append({
-                "turn": curr.get("turn"),
-                "player_hp_change": player_hp_change,
-                "opponent_hp_change": opponent_hp_change
-            })
-        
-        # Analyze opponent's revealed moves
-        revealed_moves_analysis = {}
-        for pokemon, moves in self.revealed_opponent_moves.items():
-            move_types = set()
-            for move in moves:
-                # Get move type using similarity search (fallback)
-                move_type = "Normal"  # Default
-                move_results = self.typing_matchups.similarity_search(
-                    f"move {move} type", 
-                    k=1
-                )
-                
-                if move_results:
-                    move_text = move_results[0].page_content
-                    parts = move_text.split(',')
-                    if parts:
-                        move_types.add(parts[0].strip())
-            
-            revealed_moves_analysis[pokemon] = {
+        # Usage counts, HP changes and move types are kept up to date as entries are written
+        revealed_moves_analysis = {
+            pokemon: {
                 "moves": list(moves),
-                "move_types": list(move_types)
+                "move_types": list(self.revealed_move_types.get(pokemon, ()))
             }
+            for pokemon, moves in self.revealed_opponent_moves.items()
+        }
         
         return {
-            "opponent_pokemon_usage": opponent_pokemon_usage,
-            "hp_trends": hp_trends,
+            "opponent_pokemon_usage": self.timeline.usage(),
+            "hp_trends": self.timeline.hp_trends(),
             "revealed_moves": revealed_moves_analysis,
-            "recent_turns": self.battle_history[-3:] if len(self.battle_history) >= 3 else self.battle_history
+            "recent_turns": self.timeline.recent(3)
         }
     
     def _get_pokemon_details(self, pokemon_name):
+        """Get detailed information about a Pokemon, memoized for the battle"""
+        return self.battle_memo.get_or_compute(
+            ("details", to_id(pokemon_name)),
+            lambda: self._lookup_pokemon_details(pokemon_name)
+        )
+    
+    def _lookup_pokemon_details(self, pokemon_name):
         """Get detailed information about a Pokemon from databases"""
-        # Try to get from meta_db first (for movesets)
-        meta_results = self.meta_db.similarity_search(pokemon_name, k=1)
-        pokemon_data = {}
-        if meta_results:
-            try:
-                meta_content = meta_results[0].page_content
-                meta_json = json.loads(meta_content)
-                # Extract the Pokemon data from the document
-                if pokemon_name in meta_json:
-                    pokemon_data = meta_json[pokemon_name]
-                else:
-                    # Try to find the first key if exact match not found
-                    first_key = list(meta_json.keys())[0]
-                    pokemon_data = meta_json[first_key]
-            except Exception as e:
-                print(f"Error parsing meta data for {pokemon_name}: {e}")
-        
-        # Get pokedex information
-        pokedex_results = self.pokedex.similarity_search(pokemon_name, k=1)
-        types = []
-        stats = {}
-        
-        if pokedex_results:
-            try:
-                pokedex_text = pokedex_results[0].page_content
-                # Parse CSV-like content
-                pokedex_parts = pokedex_text.split('\n')
-                if len(pokedex_parts) >= 4:
-                    # Extract types (usually in positions 1 and 2)
-                    types = pokedex_parts[10]
-                    # Extract stats if available
-                    if len(pokedex_parts) > 3:
-                        stat_names = ["hp", "attack", "defense", "sp_attack", "sp_defense", "speed"]
-                        for i, stat in enumerate(stat_names):
-                            if i + 3 < len(pokedex_parts) and pokedex_parts[i + 3].strip():
-                                try:
-                                    stats[stat] = int(pokedex_parts[i + 3])
-                                except ValueError:
-                                    stats[stat] = 0
-            except Exception as e:
-                print(f"Error parsing pokedex data for {pokemon_name}: {e}")
-        
+        # Exact match on the Showdown ID first; vector search is only a fallback
+        record = self.species_index.get(pokemon_name)
+        if record is None:
+            record = self._search_species_record(pokemon_name)
+
+        types = list(record.types) if record else []
+        stats = dict(record.stats) if record else {}
+
         # Get type weaknesses
         weaknesses = self._get_type_weaknesses(types)
         
@@ -350,92 +283,251 @@ class ContextBuilder:
             "name": pokemon_name,
             "types": types,
             "stats": stats,
-            "abilities": pokemon_data.get("abilities", {}),
-            "common_items": pokemon_data.get("items", {}),
-            "common_roles": pokemon_data.get("roles", {}),
+            "level": record.level if record else None,
+            "abilities": record.abilities if record else {},
+            "common_items": record.items if record else {},
+            "common_roles": record.roles if record else {},
             "weaknesses": weaknesses
         }
         
         return combined_data
+
+    def _search_species_record(self, pokemon_name):
+        """Resolve an unknown name to a species record using the vector stores"""
+        self.batch_resolve(species_names=[pokemon_name])
+        return self.battle_memo.get_or_compute(("resolved_species", to_id(pokemon_name)), lambda: None)
+    
+    def _resolve_move(self, name):
+        """Move record for a name, falling back to the vector stores on a miss"""
+        record = self.move_index.get(name)
+        if record is None and to_id(name):
+            self.batch_resolve(move_names=[name])
+            record = self.battle_memo.get_or_compute(("resolved_move", to_id(name)), lambda: None)
+        return record
+    
+    def _prefetch_unresolved_names(self):
+        """Gather every species and move name in the current state for batch_resolve"""
+        species_names = []
+        move_names = []
+        for side in ("player", "opponent"):
+            side_state = self.battle_state[side]
+            for pokemon in side_state.team:
+                species_names.append(pokemon.species)
+                move_names.extend(slot.name for slot in pokemon.moves)
+        for name, moves in self.revealed_opponent_moves.items():
+            species_names.append(name)
+            move_names.extend(moves)
+        self.batch_resolve(species_names, move_names)
+    
+    def batch_resolve(self, species_names=(), move_names=()):
+        """
+        Resolve every name that misses the exact-match indexes with one
+        embed_documents call, then query each collection with those vectors.
+        Matches beyond the vector store's distance cutoff count as misses.
+        Results (including misses) are memoized per battle.
+        """
+        species = {}
+        for name in species_names:
+            species_id = to_id(name)
+            if species_id and ("resolved_species", species_id) not in self.battle_memo and self.species_index.get(name) is None:
+                species[species_id] = name
+        moves = {}
+        for name in move_names:
+            move_id = to_id(name)
+            if move_id and ("resolved_move", move_id) not in self.battle_memo and self.move_index.get(name) is None:
+                moves[move_id] = name
+        if not species and not moves:
+            return
+        
+        queries = list(species.values()) + list(moves.values())
+        # Deferred so importing context doesn't load chromadb
+        from vector_store import batch_query
+        try:
+            vectors = self.knowledge.embeddings.embed_documents(queries)
+            species_vectors, move_vectors = vectors[:len(species)], vectors[len(species):]
+            
+            if species:
+                meta_hits = batch_query(self.meta_db, species_vectors)
+                pokedex_hits = batch_query(self.pokedex, species_vectors)
+                for species_id, meta_docs, pokedex_docs in zip(species, meta_hits, pokedex_hits):
+                    self.battle_memo.put(
+                        ("resolved_species", species_id), self._species_from_documents(meta_docs, pokedex_docs)
+                    )
+            
+            if moves:
+                move_hits = batch_query(self.knowledge.moves_db, move_vectors)
+                for move_id, move_docs in zip(moves, move_hits):
+                    record = None
+                    for line in (move_docs[0].split("\n") if move_docs else []):
+                        if line.startswith("id:"):
+                            record = self.move_index.get(line.split(":", 1)[1].strip())
+                    self.battle_memo.put(("resolved_move", move_id), record)
+        except Exception as e:
+            print(f"Error resolving names {queries}: {e}")
+            for species_id in species:
+                self.battle_memo.put(("resolved_species", species_id), None)
+            for move_id in moves:
+                self.battle_memo.put(("resolved_move", move_id), None)
+    
+    def _species_from_documents(self, meta_docs, pokedex_docs):
+        """Map the best meta_db / pokedex documents back to a species record"""
+        # Try meta_db first (for randbats formes)
+        if meta_docs:
+            try:
+                meta_json = json.loads(meta_docs[0])
+                record = self.species_index.get(list(meta_json.keys())[0])
+                if record:
+                    return record
+            except Exception as e:
+                print(f"Error parsing meta data: {e}")
+        
+        # Fall back to the pokedex rows, which are "column: value" lines
+        for line in (pokedex_docs[0].split("\n") if pokedex_docs else []):
+            if line.startswith("name:"):
+                return self.species_index.get(line.split(":", 1)[1].strip())
+        return None
+    
+    def _sync_matchups(self):
+        """Bring the matchup matrix up to date with both sides' records"""
+        player_team = [pokemon for pokemon in self.battle_state["player"].team if pokemon.species]
+        team_key = tuple(pokemon.key for pokemon in player_team)
+        if team_key != self._matchup_team:
+            self._matchup_team = team_key
+            details = [self._get_pokemon_details(pokemon.species) for pokemon in player_team]
+            move_types = [
+                [move["type"] for move in self._analyze_moves(pokemon.moves)["moves"] if move["category"] != "Status"]
+                for pokemon in player_team
+            ]
+            self.matchups.set_player_team(
+                [pokemon.species_id for pokemon in player_team],
+                [d.get("types", []) for d in details],
+                move_types,
+                [self._speed(pokemon) for pokemon in player_team]
+            )
+        for pokemon in player_team:
+            self.matchups.set_fainted(pokemon.species_id, pokemon.fainted)
+        
+        fainted = {}
+        for pokemon in self.battle_state["opponent"].team:
+            if pokemon.species:
+                self._matchup_row(pokemon.species)
+                fainted[pokemon.species_id] = fainted.get(pokemon.species_id, False) or pokemon.fainted
+        for species_id, is_fainted in fainted.items():
+            self.matchups.set_fainted(species_id, is_fainted)
+    
+    def _speed(self, pokemon):
+        """In-battle speed: exact for our side, the randbats speed tier for theirs, halved by paralysis"""
+        variant = "paralyzed" if pokemon.status is Status.PARALYSIS else "base"
+        if pokemon.stats.get("spe"):
+            return int(pokemon.stats["spe"] * SPEED_VARIANTS[variant])
+        speed = self.speed_tiers.speed(pokemon.species, variant)
+        if speed is None:
+            speed = int(self._combatant(pokemon).stats.get("speed", 0) * SPEED_VARIANTS[variant])
+        return speed
+    
+    def _matchup_row(self, pokemon_name):
+        """Matrix row for an opponent species, added on first sight"""
+        details = self._get_pokemon_details(pokemon_name)
+        stats = details.get("stats", {})
+        speed = self.speed_tiers.speed(pokemon_name)
+        return self.matchups.add_opponent(
+            to_id(pokemon_name), details.get("types", []), speed if speed is not None else stats.get("speed", 0), sum(stats.values())
+        )
     
     def _get_type_weaknesses(self, types):
         """Get type weaknesses for given Pokemon types"""
         if not types:
             return []
             
-        weaknesses = []
-        
-        # For each of the Pokemon's types, find attacking types that are super effective
-        for type_name in types:
-            type_name = type_name.strip()
-            # Check each attacking type in the type chart
-            for attacking_type, defenses in self.type_chart.items():
-                # If this attacking type is super effective against the defending type
-                if type_name in defenses and defenses[type_name] in ["2", "4"]:
-                    weaknesses.append(attacking_type)
-        
-        return list(set(weaknesses))  # Remove duplicates
+        # Multiply across both types so e.g. Water/Ground is not weak to Electric
+        return self.type_chart.weaknesses(types)
     
     def _analyze_team(self, team, is_player=True):
-        """Analyze a team's strengths, weaknesses, and coverage"""
-        if not team:
+        """
+        Analyze a team's strengths, weaknesses, and coverage.
+        
+        Member analyses are cached for the battle by (species, moves), and
+        team totals are extended only for newly revealed members, so a
+        rebuild just overlays current HP and status.
+        """
+        members = [pokemon for pokemon in team if pokemon.species]
+        if not members:
             return {"status": "unknown"}
-            
-        team_analysis = {
-            "pokemon": [],
-            "team_typing": {},
-            "overall_strengths": [],
-            "overall_weaknesses": []
-        }
-        
-        type_counts = {}
-        team_strengths = set()
-        team_weaknesses = set()
         
-        for pokemon in team:
-            pokemon_name = pokemon.get("details", "").split(",")[0]
-            if not pokemon_name:
-                continue
-                
-            # Get detailed Pokemon info
-            pokemon_info = self._get_pokemon_details(pokemon_name)
-            
-            # For player's Pokemon, we know the moves
-            if is_player:
-                moves_analysis = self._analyze_moves(pokemon.get("moves", []))
-            else:
-                # For opponent, predict possible movesets
-                moves_analysis = self._predict_possible_movesets(pokemon_name)
-            
-            # Add types to the count
-            for type_name in pokemon_info.get("types", []):
-                if type_name in type_counts:
-                    type_counts[type_name] += 1
-                else:
-                    type_counts[type_name] = 1
-            
-            # Add to team analysis
-            pokemon_analysis = {
-                "name": pokemon_name,
-                "details": pokemon_info,
-                "current_hp_percent": pokemon.get("hp", 100) / 100 if pokemon.get("hp") else 1.0,
-                "status": pokemon.get("status", None),
-                "moves": moves_analysis
-            }
-            
-            # Add strengths and weaknesses
-            team_strengths.update(moves_analysis.get("strengths", []))
-            team_weaknesses.update(pokemon_info.get("weaknesses", []))
-            
-            team_analysis["pokemon"].append(pokemon_analysis)
+        keys = [self._member_key(pokemon, is_player) for pokemon in members]
+        entries = [
+            self.battle_memo.get_or_compute(key, lambda pokemon=pokemon: self._compute_member_analysis(pokemon, is_player))
+            for key, pokemon in zip(keys, members)
+        ]
+        type_counts, team_strengths, team_weaknesses = self._team_totals_for(
+            "player" if is_player else "opponent", tuple(keys), entries
+        )
         
-        team_analysis["team_typing"] = type_counts
-        team_analysis["overall_strengths"] = list(team_strengths)
-        team_analysis["overall_weaknesses"] = list(team_weaknesses)
+        return {
+            "pokemon": [
+                dict(entry, current_hp_percent=pokemon.hp_fraction, status=pokemon.status.value or None)
+                for entry, pokemon in zip(entries, members)
+            ],
+            "team_typing": dict(type_counts),
+            "overall_strengths": list(team_strengths),
+            "overall_weaknesses": list(team_weaknesses)
+        }
+    
+    def _member_key(self, pokemon, is_player):
+        """Memo key for a member's analysis: species and moves (revealed moves for the opponent)"""
+        if is_player:
+            return ("player_member",) + pokemon.key
+        revealed = self.revealed_opponent_moves.get(pokemon.species.strip(), set())
+        return ("opponent_member", pokemon.species_id, frozenset(to_id(move) for move in revealed))
+    
+    def _compute_member_analysis(self, pokemon, is_player):
+        """Analyze one team member, without HP or status"""
+        pokemon_name = pokemon.species
+        pokemon_info = self._get_pokemon_details(pokemon_name)
+        
+        # For player's Pokemon, we know the moves
+        if is_player:
+            moves_analysis = self._analyze_moves(pokemon.moves)
+        else:
+            # For opponent, predict possible movesets
+            moves_analysis = self._predict_possible_movesets(pokemon_name)
         
-        return team_analysis
+        return {
+            "name": pokemon_name,
+            "details": pokemon_info,
+            "moves": moves_analysis
+        }
+    
+    def _team_totals_for(self, side, keys, entries):
+        """Type counts, strengths and weaknesses, folding in only members not seen last time"""
+        cached_keys, totals = self._team_totals.get(side, ((), None))
+        if totals is not None and keys == cached_keys:
+            return totals
+        
+        if totals is not None and keys[:len(cached_keys)] == cached_keys:
+            # Opponent rosters only grow, so usually just the new members are added
+            start = len(cached_keys)
+            type_counts, strengths, weaknesses = dict(totals[0]), set(totals[1]), set(totals[2])
+        else:
+            start = 0
+            type_counts, strengths, weaknesses = {}, set(), set()
+        
+        for entry in entries[start:]:
+            for type_name in entry["details"].get("types", []):
+                type_counts[type_name] = type_counts.get(type_name, 0) + 1
+            strengths.update(entry["moves"].get("strengths", []))
+            weaknesses.update(entry["details"].get("weaknesses", []))
+        
+        totals = (type_counts, strengths, weaknesses)
+        self._team_totals[side] = (keys, totals)
+        return totals
     
     def _analyze_moves(self, moves):
+        """Analyze a set of moves, memoized for the battle by moveset"""
+        key = ("moves", tuple(to_id(move_name(move)) for move in moves or []))
+        return self.battle_memo.get_or_compute(key, lambda: self._compute_move_analysis(moves))
+    
+    def _compute_move_analysis(self, moves):
         """Analyze a set of moves for type coverage and effectiveness"""
         if not moves:
             return {"moves": [], "strengths": []}
@@ -446,79 +538,74 @@ class ContextBuilder:
         }
         
         for move in moves:
-            # For now, we'll assume the move type is the same as the move name
-            # In a real implementation, you'd have a mapping of moves to their types
-            # This is a simplification - you should replace this with actual move type data
-            move_type = "Normal"  # Default
-            
-            # Try to get move type from similarity search (fallback)
-            # In a complete implementation, you'd replace this with a direct lookup
-            move_results = self.typing_matchups.similarity_search(
-                f"move {move} type", 
-                k=1
-            )
-            
-            if move_results:
-                move_text = move_results[0].page_content
-                parts = move_text.split(',')
-                if len(parts) >= 1:
-                    move_type = parts[0].strip()
+            name = move_name(move)
+            record = self._resolve_move(name)
+            move_type = record.type if record else "Normal"  # Default
             
             move_analysis["moves"].append({
-                "name": move,
-                "type": move_type
+                "name": name,
+                "type": move_type,
+                "base_power": record.base_power if record else 0,
+                "category": record.category if record else "Unknown",
+                "priority": record.priority if record else 0
             })
-            
-            # Find what this move is strong against using the type chart
-            if move_type in self.type_chart:
-                for defending_type, effectiveness in self.type_chart[move_type].items():
-                    if effectiveness in ["2", "4"]:
-                        move_analysis["strengths"].append(defending_type)
         
-        move_analysis["strengths"] = list(set(move_analysis["strengths"]))  # Remove duplicates
+        # Types hit super effectively by any damaging move
+        coverage = self._move_coverage(moves)
+        move_analysis["strengths"] = self.type_chart.mask_types(coverage.super_effective)
         return move_analysis
     
+    def _move_coverage(self, moves):
+        """Coverage bitmasks of a moveset's damaging moves, memoized for the battle"""
+        key = ("coverage", tuple(to_id(move_name(move)) for move in moves or []))
+        return self.battle_memo.get_or_compute(key, lambda: self.type_chart.coverage(
+            record.type if record else "Normal"
+            for record in (self._resolve_move(move_name(move)) for move in moves or [])
+            if record is None or record.is_damaging
+        ))
+    
     def _predict_possible_movesets(self, pokemon_name):
+        """Predict possible movesets, memoized by species and revealed moves"""
+        revealed_moves = self.revealed_opponent_moves.get(pokemon_name.strip(), set())
+        key = ("predicted", to_id(pokemon_name), frozenset(to_id(move) for move in revealed_moves))
+        return self.battle_memo.get_or_compute(key, lambda: self._compute_possible_movesets(pokemon_name))
+    
+    def _compute_possible_movesets(self, pokemon_name):
         """Predict possible movesets for opponent's Pokemon"""
-        meta_results = self.meta_db.similarity_search(pokemon_name, k=1)
-        
-        if not meta_results:
-            return {"moves": [], "strengths": []}
-            
-        try:
-            meta_content = meta_results[0].page_content
-            meta_json = json.loads(meta_content)
-            
-            # Extract the Pokemon data
-            pokemon_data = None
-            if pokemon_name in meta_json:
-                pokemon_data = meta_json[pokemon_name]
-            else:
-                # Try to find the first key if exact match not found
-                first_key = list(meta_json.keys())[0]
-                pokemon_data = meta_json[first_key]
-                
-            if not pokemon_data:
-                return {"moves": [], "strengths": []}
-                
-            # Extract common moves from roles
-            all_moves = set()
-            for role_data in pokemon_data.get("roles", {}).values():
-                role_moves = role_data.get("moves", {})
-                all_moves.update(role_moves.keys())
-            
-            # Analyze these moves
-            return self._analyze_moves(list(all_moves))
-            
-        except Exception as e:
-            print(f"Error predicting movesets for {pokemon_name}: {e}")
-            return {"moves": [], "strengths": []}
+        sets = self.randbats_index.get(pokemon_name)
+        if sets is None:
+            # Only resolve unknown names through the vector store
+            record = self._search_species_record(pokemon_name)
+            sets = self.randbats_index.get(record.name) if record else None
+        if sets is None:
+            return {"moves": [], "strengths": [], "move_probabilities": {}}
+        
+        # Weighted move distribution, conditioned on anything already revealed
+        revealed_moves = self.revealed_opponent_moves.get(pokemon_name.strip(), set())
+        likely_moves = self.randbats_index.likely_moves(sets.name, revealed_moves)
+        
+        # Analyze these moves; the analysis is a shared memo entry, so extend a copy
+        moves_analysis = dict(self._analyze_moves([name for name, _ in likely_moves]))
+        moves_analysis["move_probabilities"] = dict(likely_moves)
+        return moves_analysis
     
     def _analyze_current_matchup(self):
+        """Analyze the current active Pokemon matchup, once per build"""
+        return self.build_memo.get_or_compute(("matchup",), self._current_matchup_section)
+    
+    def _current_matchup_section(self):
+        """Reuse the matchup while the actives are unchanged, overlaying current HP"""
+        matchup = self._section("current_matchup", self._matchup_inputs(), self._compute_current_matchup)
+        if "player_pokemon" not in matchup:
+            return matchup
+        player_hp_percent, opponent_hp_percent = self._active_hp()
+        return dict(matchup, player_hp_percent=player_hp_percent, opponent_hp_percent=opponent_hp_percent)
+    
+    def _compute_current_matchup(self):
         """Analyze the current active Pokemon matchup"""
         #print("The battle state is as follows",self.battle_state)
-        player_active = self.battle_state["player"]["active"]
-        opponent_active = self.battle_state["opponent"]["active"]
+        player_active = self.battle_state["player"].active
+        opponent_active = self.battle_state["opponent"].active
         
         print("\n=== ANALYZING CURRENT MATCHUP ===")
         print(f"Player active data: {player_active}")
@@ -532,31 +619,8 @@ class ContextBuilder:
             print("Missing opponent's active Pokémon data")
             return {"status": "incomplete", "reason": "Missing opponent's active Pokémon data"}
         
-        # Extract player Pokémon name, handling different possible formats
-        player_pokemon = None
-        if isinstance(player_active, dict):
-            if "details" in player_active:
-                player_pokemon = player_active["details"].split(",")[0]
-                print(f"Extracted player Pokémon from details: {player_pokemon}")
-            elif "name" in player_active:
-                player_pokemon = player_active["name"].split(",")[0]
-                print(f"Extracted player Pokémon from name: {player_pokemon}")
-        elif isinstance(player_active, str):
-            player_pokemon = player_active.split(",")[0]
-            print(f"Extracted player Pokémon from string: {player_pokemon}")
-            
-        # Extract opponent Pokémon name, handling different possible formats
-        opponent_pokemon = None
-        if isinstance(opponent_active, dict):
-            if "details" in opponent_active:
-                opponent_pokemon = opponent_active["details"].split(",")[0]
-                print(f"Extracted opponent Pokémon from details: {opponent_pokemon}")
-            elif "name" in opponent_active:
-                opponent_pokemon = opponent_active["name"].split(",")[0]
-                print(f"Extracted opponent Pokémon from name: {opponent_pokemon}")
-        elif isinstance(opponent_active, str):
-            opponent_pokemon = opponent_active.split(",")[0]
-            print(f"Extracted opponent Pokémon from string: {opponent_pokemon}")
+        player_pokemon = player_active.species
+        opponent_pokemon = opponent_active.species
         
         # If we couldn't extract names, return incomplete status
         if not player_pokemon:
@@ -573,42 +637,31 @@ class ContextBuilder:
         opponent_details = self._get_pokemon_details(opponent_pokemon)
         #print("The details of the opponent are as follows",opponent_details)
         # Analyze type matchup
-        player_moves = []
-        if isinstance(player_active, dict) and "moves" in player_active:
-            player_moves = player_active["moves"]
-        player_move_analysis = self._analyze_moves(player_moves)
+        player_move_analysis = self._analyze_moves(player_active.moves)
         
         # Check if player has super effective moves
-        player_has_super_effective = any(
-            type_name in player_move_analysis["strengths"] 
-            for type_name in opponent_details["types"]
+        chart = self.type_chart
+        player_has_super_effective = bool(
+            self._move_coverage(player_active.moves).super_effective & chart.type_mask(opponent_details["types"])
         )
         print("player_move_analysis",player_move_analysis["strengths"])
         # Check if opponent might have super effective moves
         opponent_move_analysis = self._predict_possible_movesets(opponent_pokemon)
-        opponent_might_have_super_effective = any(
-            type_name in opponent_move_analysis["strengths"] 
-            for type_name in player_details["types"]
+        opponent_might_have_super_effective = bool(
+            chart.type_mask(opponent_move_analysis["strengths"]) & chart.type_mask(player_details["types"])
         )
         
-        # Speed comparison
-        player_speed = player_details.get("stats", {}).get("speed", 0)
-        opponent_speed = opponent_details.get("stats", {}).get("speed", 0)
+        # Speed comparison at in-battle stats (set level, EVs, paralysis)
+        player_speed = self._speed(player_active)
+        opponent_speed = self._speed(opponent_active)
+        opponent_scarf_speed = None
+        record = self.species_index.get(opponent_pokemon)
+        if record and "Choice Scarf" in record.items:
+            opponent_scarf_speed = int(opponent_speed * SPEED_VARIANTS["scarf"])
         
         # HP percentage calculation with safety checks
-        player_hp_percent = 1.0
-        if isinstance(player_active, dict) and "hp" in player_active:
-            try:
-                player_hp_percent = player_active["hp"] / 100 if player_active["hp"] else 1.0
-            except (TypeError, ZeroDivisionError):
-                player_hp_percent = 1.0
-                
-        opponent_hp_percent = 1.0
-        if isinstance(opponent_active, dict) and "hp" in opponent_active:
-            try:
-                opponent_hp_percent = opponent_active["hp"] / 100 if opponent_active["hp"] else 1.0
-            except (TypeError, ZeroDivisionError):
-                opponent_hp_percent = 1.0
+        player_hp_percent = player_active.hp_fraction
+        opponent_hp_percent = opponent_active.hp_fraction
         
         matchup_result = {
             "player_pokemon": player_pokemon,
@@ -617,6 +670,8 @@ class ContextBuilder:
             "opponent_might_have_super_effective": opponent_might_have_super_effective,
             "player_faster": player_speed > opponent_speed,
             "speed_comparison": f"{player_speed} vs {opponent_speed}",
+            "opponent_scarf_speed": opponent_scarf_speed,
+            "opponent_outspeeds_with_scarf": opponent_scarf_speed is not None and opponent_scarf_speed > player_speed,
             "player_hp_percent": player_hp_percent,
             "opponent_hp_percent": opponent_hp_percent
         }
@@ -627,11 +682,18 @@ class ContextBuilder:
         return matchup_result
     
     def _analyze_field_effects(self):
+        """Analyze current field effects, recomputed only when the field changes"""
+        return self.build_memo.get_or_compute(
+            ("field_effects",),
+            lambda: self._section("field_effects", self._field_inputs(), self._compute_field_effects)
+        )
+    
+    def _compute_field_effects(self):
         """Analyze current field effects and their impact"""
         weather = self.battle_state["weather"]
         terrain = self.battle_state["terrain"]
-        player_conditions = self.battle_state["player"]["side_conditions"]
-        opponent_conditions = self.battle_state["opponent"]["side_conditions"]
+        player_conditions = self.battle_state["player"].side_conditions
+        opponent_conditions = self.battle_state["opponent"].side_conditions
         
         weather_effects = {}
         if weather:
@@ -700,14 +762,14 @@ class ContextBuilder:
     
     def _generate_strategic_options(self):
         """Generate strategic options based on current battle state"""
-        player_active = self.battle_state["player"]["active"]
-        opponent_active = self.battle_state["opponent"]["active"]
+        player_active = self.battle_state["player"].active
+        opponent_active = self.battle_state["opponent"].active
         
         if not player_active or not opponent_active:
             return {"options": ["Gather more information"]}
             
-        player_pokemon = player_active.get("details", "").split(",")[0]
-        opponent_pokemon = opponent_active.get("details", "").split(",")[0]
+        player_pokemon = player_active.species
+        opponent_pokemon = opponent_active.species
         
         matchup = self._analyze_current_matchup()
         
@@ -748,8 +810,7 @@ class ContextBuilder:
             reduced_types = weather_effects.get("reduces", [])
             
             # Check if we have moves that are boosted by weather
-            player_moves = player_active.get("moves", [])
-            move_analysis = self._analyze_moves(player_moves)
+            move_analysis = self._analyze_moves(player_active.moves)
             
             for move in move_analysis.get("moves", []):
                 if move.get("type") in boosted_types:
@@ -765,14 +826,12 @@ class ContextBuilder:
         pokemon_details = self._get_pokemon_details(pokemon_name)
         types = pokemon_details.get("types", [])
         
-        counter_suggestions = []
-        for type_name in types:
-            # Search for matchups where this type is weak
-            matchups = self.typing_matchups.similarity_search(
-                f"moves that are super effective against {type_name}", 
-                k=2
-            )
-            counter_suggestions.extend([match.page_content for match in matchups])
+        # Attacking types that hit the combined typing super effectively, strongest first
+        counter_suggestions = sorted(
+            ({"type": type_name, "multiplier": self.type_chart.multiplier(type_name, types)}
+             for type_name in self.type_chart.weaknesses(types)),
+            key=lambda counter: -counter["multiplier"]
+        ) if types else []
             
         return {
             "pokemon": pokemon_name,
@@ -783,43 +842,28 @@ class ContextBuilder:
     
     def suggest_switch(self, opponent_pokemon):
         """Suggest which Pokemon to switch to against opponent's active"""
-        if not self.battle_state["player"]["team"]:
+        if not self.battle_state["player"].pokemon:
             return {"suggestion": "No team data available"}
             
         opponent_details = self._get_pokemon_details(opponent_pokemon)
         opponent_types = opponent_details.get("types", [])
-        opponent_moves = self._predict_possible_movesets(opponent_pokemon)
+        row = self._matchup_row(opponent_pokemon)
         
-        best_switches = []
+        active = self.battle_state["player"].active
+        scores = self.matchups.switch_scores(to_id(opponent_pokemon), exclude=active.species_id if active else None)
+        resists = len(opponent_types) - self.matchups.scores("they_hit_weak")[row]
+        super_effective = self.matchups.scores("se_coverage")[row]
         
-        for pokemon in self.battle_state["player"]["team"]:
-            if pokemon.get("active", False):
-                continue  # Skip currently active Pokemon
-                
-            pokemon_name = pokemon.get("details", "").split(",")[0]
-            pokemon_details = self._get_pokemon_details(pokemon_name)
-            
-            # Check if this Pokemon resists opponent's types
-            resists_count = 0
-            for opponent_type in opponent_types:
-                if opponent_type not in pokemon_details.get("weaknesses", []):
-                    resists_count += 1
-            
-            # Check if this Pokemon has super effective moves
-            pokemon_moves = self._analyze_moves(pokemon.get("moves", []))
-            super_effective_count = 0
-            for opponent_type in opponent_types:
-                if opponent_type in pokemon_moves.get("strengths", []):
-                    super_effective_count += 1
-            
-            # Calculate a simple score
-            score = resists_count + super_effective_count
-            
+        best_switches = []
+        for pokemon in self.battle_state["player"].team:
+            if pokemon.species_id not in scores:
+                continue  # Skip the active and fainted Pokemon
+            column = self.matchups.player_column[pokemon.species_id]
             best_switches.append({
-                "pokemon": pokemon_name,
-                "score": score,
-                "resists_opponent_types": resists_count > 0,
-                "has_super_effective": super_effective_count > 0
+                "pokemon": pokemon.species,
+                "score": int(scores[pokemon.species_id]),
+                "resists_opponent_types": bool(resists[column] > 0),
+                "has_super_effective": bool(super_effective[column] > 0)
             })
         
         # Sort by score
@@ -831,53 +875,102 @@ class ContextBuilder:
             "switch_options": best_switches[:3]  # Top 3 options
         }
     
+    def _combatant(self, pokemon):
+        """Damage-calc view of a Pokemon: randbats level, EVs and IVs over base stats, current HP"""
+        details = self._get_pokemon_details(pokemon.species)
+        stats = self.battle_memo.get_or_compute(
+            ("stats", pokemon.species_id, pokemon.level),
+            lambda: self._compute_stats(pokemon.species, details, pokemon.level)
+        )
+        # Our own requests carry the exact stats
+        if pokemon.stats:
+            stats = dict(stats, **{STAT_KEYS[k]: v for k, v in pokemon.stats.items() if k in STAT_KEYS})
+            stats["hp"] = pokemon.max_hp
+        return Combatant(
+            name=pokemon.species,
+            level=pokemon.level,
+            types=tuple(details.get("types", [])),
+            stats=stats,
+            current_hp=round(pokemon.hp_fraction * stats.get("hp", 1)),
+            burned=pokemon.status is Status.BURN
+        )
+    
+    def _compute_stats(self, pokemon_name, details, level):
+        record = self.species_index.get(pokemon_name)
+        return compute_stats(details.get("stats", {}), level, record.evs if record else None, record.ivs if record else None)
+    
+    def _damage_table(self, attacker, move_names, defenders):
+        """Damage of an attacker's moves against several defenders in one vectorized pass"""
+        return self.damage_calculator.calculate(
+            self._combatant(attacker),
+            [self._resolve_move(name) for name in move_names],
+            [self._combatant(defender) for defender in defenders],
+            weather=self.battle_state["weather"],
+            names=move_names
+        )
+    
+    def _likely_move_names(self, pokemon_name, min_probability=0.25, limit=6):
+        probabilities = self._predict_possible_movesets(pokemon_name).get("move_probabilities", {})
+        return [name for name, probability in probabilities.items() if probability >= min_probability][:limit]
+    
+    def estimate_damage(self):
+        """
+        Damage ranges and KO chances for our active's moves against every living
+        revealed opponent, and the opponent active's likely moves against our
+        living team (each candidate switch-in).
+        """
+        player_active = self.battle_state["player"].active
+        opponent_active = self.battle_state["opponent"].active
+        if not player_active or not opponent_active:
+            return {"status": "Insufficient data"}
+        
+        targets = [opponent_active] + [
+            pokemon for pokemon in self.battle_state["opponent"].team
+            if pokemon.species_id != opponent_active.species_id and not pokemon.fainted and pokemon.species
+        ]
+        targets = list({pokemon.species_id: pokemon for pokemon in targets}.values())
+        switch_ins = [pokemon for pokemon in self.battle_state["player"].team if not pokemon.fainted]
+        
+        return {
+            "player_moves": self._damage_table(
+                player_active, [slot.name for slot in player_active.moves], targets
+            ).to_dict(),
+            "opponent_moves": self._damage_table(
+                opponent_active, self._likely_move_names(opponent_active.species), switch_ins
+            ).to_dict()
+        }
+    
     def suggest_best_move(self):
         """Suggest the best move for the current matchup"""
-        player_active = self.battle_state["player"]["active"]
-        opponent_active = self.battle_state["opponent"]["active"]
+        player_active = self.battle_state["player"].active
+        opponent_active = self.battle_state["opponent"].active
         
         if not player_active or not opponent_active:
             return {"suggestion": "Insufficient data"}
             
-        player_pokemon = player_active.get("details", "").split(",")[0]
-        opponent_pokemon = opponent_active.get("details", "").split(",")[0]
+        player_pokemon = player_active.species
+        opponent_pokemon = opponent_active.species
         
         opponent_details = self._get_pokemon_details(opponent_pokemon)
         opponent_types = opponent_details.get("types", [])
         
-        player_moves = player_active.get("moves", [])
+        player_moves = player_active.moves
         move_ratings = []
         
-        for move in player_moves:
+        # Damage of every move against the opponent's active, in one pass
+        damage = self._damage_table(player_active, [slot.name for slot in player_moves], [opponent_active])
+        
+        for index, move in enumerate(player_moves):
             # Get move type (same approach as in _analyze_moves)
-            move_type = "Normal"  # Default
-            move_results = self.typing_matchups.similarity_search(
-                f"move {move} type", 
-                k=1
-            )
+            move = move_name(move)
+            record = self._resolve_move(move)
+            move_type = record.type if record else "Normal"  # Default
             
-            if move_results:
-                move_text = move_results[0].page_content
-                parts = move_text.split(',')
-                if len(parts) >= 1:
-                    move_type = parts[0].strip()
-            
-            # Check effectiveness against opponent types using the type chart
+            # Check effectiveness against the opponent's combined typing (status moves score neutral)
             effectiveness_score = 0
-            for opponent_type in opponent_types:
-                opponent_type = opponent_type.strip()
-                if move_type in self.type_chart and opponent_type in self.type_chart[move_type]:
-                    effectiveness = self.type_chart[move_type][opponent_type]
-                    if effectiveness == "2":
-                        effectiveness_score += 2  # Super effective
-                    elif effectiveness == "4":
-                        effectiveness_score += 4  # Double super effective
-                    elif effectiveness == "0.5":
-                        effectiveness_score -= 1  # Not very effective
-                    elif effectiveness == "0.25":
-                        effectiveness_score -= 2  # Double not very effective
-                    elif effectiveness == "0":
-                        effectiveness_score -= 5  # No effect
+            if record is None or record.is_damaging:
+                effectiveness = self.type_chart.multiplier(move_type, opponent_types)
+                effectiveness_score = EFFECTIVENESS_SCORES.get(effectiveness, 0)
             
             # Consider field effects
             field_effects = self._analyze_field_effects()
@@ -909,11 +1002,17 @@ class ContextBuilder:
                 "effectiveness_score": effectiveness_score,
                 "weather_bonus": weather_bonus,
                 "terrain_bonus": terrain_bonus,
-                "final_score": final_score
+                "final_score": final_score,
+                "min_damage_percent": round(float(damage.min_percent[index, 0]), 1),
+                "max_damage_percent": round(float(damage.max_percent[index, 0]), 1),
+                "ko_probability": round(float(damage.ko_probability[index, 0]), 3)
             })
         
-        # Sort by final score
-        move_ratings.sort(key=lambda x: x["final_score"], reverse=True)
+        # Rank by KO chance, then expected damage, then the type/field score
+        move_ratings.sort(
+            key=lambda x: (x["ko_probability"], x["min_damage_percent"] + x["max_damage_percent"], x["final_score"]),
+            reverse=True
+        )
         
         return {
             "player_pokemon": player_pokemon,
@@ -925,14 +1024,14 @@ class ContextBuilder:
         
     def should_switch(self):
         """Determine if the player should switch Pokemon"""
-        player_active = self.battle_state["player"]["active"]
-        opponent_active = self.battle_state["opponent"]["active"]
+        player_active = self.battle_state["player"].active
+        opponent_active = self.battle_state["opponent"].active
         
         if not player_active or not opponent_active:
             return {"should_switch": False, "reason": "Insufficient data"}
             
-        player_pokemon = player_active.get("details", "").split(",")[0]
-        opponent_pokemon = opponent_active.get("details", "").split(",")[0]
+        player_pokemon = player_active.species
+        opponent_pokemon = opponent_active.species
         
         # Get matchup analysis
         matchup = self._analyze_current_matchup()
@@ -951,7 +1050,7 @@ class ContextBuilder:
         print("move_suggestion",move_suggestion)
         best_move_score = 0
         if move_suggestion.get("move_ratings"):
-            best_move_score = move_suggestion["move_ratings"][0].get("final_score", 0)
+            best_move_score = max(rating.get("final_score", 0) for rating in move_suggestion["move_ratings"])
             
         if best_move_score < 0:
             return {
@@ -967,17 +1066,17 @@ class ContextBuilder:
             }
         
         # Check if player has a status condition that severely limits effectiveness
-        if player_active.get("status") in ["slp", "frz", "par"]:
+        if player_active.status in (Status.SLEEP, Status.FREEZE, Status.PARALYSIS):
             return {
                 "should_switch": True,
-                "reason": f"Hindering status condition: {player_active.get('status')}"
+                "reason": f"Hindering status condition: {player_active.status.value}"
             }
         
         return {"should_switch": False, "reason": "Current matchup is favorable or neutral"}
     
     def analyze_opponent_team(self):
         """Analyze opponent's team composition and potential threats"""
-        opponent_team = self.battle_state["opponent"]["team"]
+        opponent_team = self.battle_state["opponent"].team
         
         if not opponent_team:
             return {"status": "No opponent team data available"}
@@ -985,7 +1084,7 @@ class ContextBuilder:
         # Analyze each revealed Pokemon
         revealed_pokemon = []
         for pokemon in opponent_team:
-            pokemon_name = pokemon.get("details", "").split(",")[0]
+            pokemon_name = pokemon.species
             if not pokemon_name:
                 continue
                 
@@ -1001,7 +1100,7 @@ class ContextBuilder:
             predicted_moves = self._predict_possible_movesets(pokemon_name)
             
             # Determine potential threat level to our team
-            threat_level = self._calculate_threat_level(pokemon_details)
+            threat_level = self._calculate_threat_level(pokemon_name)
             
             revealed_pokemon.append({
                 "name": pokemon_name,
@@ -1029,49 +1128,26 @@ class ContextBuilder:
             "top_threats": revealed_pokemon[:2] if len(revealed_pokemon) >= 2 else revealed_pokemon
         }
     
-    def _calculate_threat_level(self, pokemon_details):
+    def _calculate_threat_level(self, pokemon_name):
         """Calculate threat level of an opponent's Pokemon to our team"""
-        player_team = self.battle_state["player"]["team"]
-        
-        if not player_team or not pokemon_details:
+        if not self.battle_state["player"].pokemon:
             return 0
         
-        threat_score = 0
-        opponent_types = pokemon_details.get("types", [])
-        
-        # Check how many of our Pokemon are weak to this Pokemon's types
-        for player_pokemon in player_team:
-            player_name = player_pokemon.get("details", "").split(",")[0]
-            player_details = self._get_pokemon_details(player_name)
-            
-            # Check if player Pokemon is weak to opponent's types
-            for opponent_type in opponent_types:
-                if opponent_type in player_details.get("weaknesses", []):
-                    threat_score += 1
-        
-        # Consider base stats as a factor
-        stats = pokemon_details.get("stats", {})
-        base_stat_total = sum(stats.values())
-        
-        # Normalize base stat total to a 0-3 scale
-        stat_factor = min(3, max(0, base_stat_total / 200))
-        
-        # Combine factors
-        total_threat = threat_score + stat_factor
-        
-        return total_threat
+        # Our living members weak to its types plus a 0-3 base stat factor, from the matrix
+        self._matchup_row(pokemon_name)
+        return self.matchups.threat(to_id(pokemon_name))
     
     def predict_opponent_switch(self):
         """Predict if opponent might switch and to which Pokemon"""
-        opponent_active = self.battle_state["opponent"]["active"]
-        opponent_team = self.battle_state["opponent"]["team"]
-        player_active = self.battle_state["player"]["active"]
+        opponent_active = self.battle_state["opponent"].active
+        opponent_team = self.battle_state["opponent"].team
+        player_active = self.battle_state["player"].active
         
         if not opponent_active or not player_active or not opponent_team:
             return {"prediction": "Insufficient data"}
         
-        opponent_pokemon = opponent_active.get("details", "").split(",")[0]
-        player_pokemon = player_active.get("details", "").split(",")[0]
+        opponent_pokemon = opponent_active.species
+        player_pokemon = player_active.species
         
         # Get matchup analysis
         matchup = self._analyze_current_matchup()
@@ -1088,7 +1164,7 @@ class ContextBuilder:
             switch_probability += 0.2  # More likely to switch at low HP
         
         # Check if opponent has a bad status condition
-        if opponent_active.get("status") in ["slp", "frz", "par"]:
+        if opponent_active.status in (Status.SLEEP, Status.FREEZE, Status.PARALYSIS):
             switch_probability += 0.2  # More likely to switch with bad status
         
         # Cap probability at 0.9 (90%)
@@ -1097,26 +1173,15 @@ class ContextBuilder:
         # Predict which Pokemon they might switch to
         potential_switches = []
         
-        player_details = self._get_pokemon_details(player_pokemon)
-        player_types = player_details.get("types", [])
-        
-        for pokemon in opponent_team:
-            if pokemon.get("active", False):
-                continue  # Skip currently active Pokemon
-                
-            pokemon_name = pokemon.get("details", "").split(",")[0]
-            pokemon_details = self._get_pokemon_details(pokemon_name)
-            
-            # Check if this Pokemon resists player's types
-            resistance_score = 0
-            for player_type in player_types:
-                if player_type not in pokemon_details.get("weaknesses", []):
-                    resistance_score += 1
-            
+        # How many of our active's types each living benched opponent is not weak to
+        names = {pokemon.species_id: pokemon.species for pokemon in opponent_team}
+        scores = self.matchups.resistance_scores(player_active.species_id, exclude=opponent_active.species_id)
+        for species_id, resistance_score in scores.items():
+            row = self.matchups.opponent_row[species_id]
             potential_switches.append({
-                "pokemon": pokemon_name,
-                "resistance_score": resistance_score,
-                "types": pokemon_details.get("types", [])
+                "pokemon": names.get(species_id, species_id),
+                "resistance_score": int(resistance_score),
+                "types": self.matchups.opponent_types[row]
             })
         
         # Sort by resistance score
@@ -1130,83 +1195,77 @@ class ContextBuilder:
     
     def analyze_team_coverage(self):
         """Analyze team's type coverage and identify gaps"""
-        player_team = self.battle_state["player"]["team"]
+        player_team = self.battle_state["player"].team
         
         if not player_team:
             return {"status": "No team data available"}
         
-        # Get all Pokemon types
-        all_types = [
-            "Normal", "Fire", "Water", "Electric", "Grass", "Ice", "Fighting", 
-            "Poison", "Ground", "Flying", "Psychic", "Bug", "Rock", "Ghost", 
-            "Dragon", "Dark", "Steel", "Fairy"
-        ]
+        chart = self.type_chart
+        masks = [self._move_coverage(pokemon.moves).super_effective for pokemon in player_team]
         
-        # Initialize coverage map
-        coverage = {type_name: 0 for type_name in all_types}
+        # Types hit super effectively by anyone, and by two or more members
+        covered = overlap = 0
+        for mask in masks:
+            overlap |= covered & mask
+            covered |= mask
         
-        # Analyze each Pokemon's move coverage
-        for pokemon in player_team:
-            pokemon_name = pokemon.get("details", "").split(",")[0]
-            moves = pokemon.get("moves", [])
-            
-            move_analysis = self._analyze_moves(moves)
-            
-            # Add coverage from this Pokemon's moves
-            for type_name in move_analysis.get("strengths", []):
-                if type_name in coverage:
-                    coverage[type_name] += 1
-        
-        # Identify gaps in coverage
-        gaps = []
-        for type_name, count in coverage.items():
-            if count == 0:
-                gaps.append(type_name)
-            
-        # Calculate overall coverage percentage
-        covered_types = sum(1 for count in coverage.values() if count > 0)
-        coverage_percentage = (covered_types / len(all_types)) * 100
+        coverage = {
+            type_name: sum(mask >> i & 1 for mask in masks)
+            for i, type_name in enumerate(chart.types)
+        }
         
         return {
             "type_coverage": coverage,
-            "coverage_percentage": coverage_percentage,
-            "gaps": gaps
+            "coverage_percentage": covered.bit_count() / len(chart.types) * 100,
+            "gaps": chart.mask_types(chart.full_mask & ~covered),
+            "overlap": chart.mask_types(overlap),
+            "revealed_opponent_coverage": self.cover_revealed_opponents()
         }
     
+    def cover_revealed_opponents(self):
+        """For each revealed opponent, which of our remaining Pokemon hit its typing super effectively"""
+        chart = self.type_chart
+        remaining = [
+            (pokemon.species, self._move_coverage(pokemon.moves))
+            for pokemon in self.battle_state["player"].team
+            if not pokemon.fainted
+        ]
+        
+        result = {}
+        for pokemon in self.battle_state["opponent"].team:
+            if not pokemon.species or pokemon.species in result:
+                continue
+            combo = chart.combo_bit(self._get_pokemon_details(pokemon.species).get("types", []))
+            result[pokemon.species] = [name for name, coverage in remaining if coverage.hits(combo)]
+        return result
+    
+    def members_covering(self, types):
+        """Our remaining Pokemon with a super effective move against any of the given types"""
+        mask = self.type_chart.type_mask(types)
+        return [
+            pokemon.species
+            for pokemon in self.battle_state["player"].team
+            if not pokemon.fainted and self._move_coverage(pokemon.moves).super_effective & mask
+        ]
+    
     def get_move_description(self, move_name):
         """Get detailed description of a move"""
-        # Get move type (same approach as in _analyze_moves)
-        move_type = "Normal"  # Default
-        move_results = self.typing_matchups.similarity_search(
-            f"move {move_name} type", 
-            k=1
-        )
-        
-        if move_results:
-            move_text = move_results[0].page_content
-            parts = move_text.split(',')
-            if len(parts) >= 1:
-                move_type = parts[0].strip()
+        # Get move data (same approach as in _analyze_moves)
+        record = self._resolve_move(move_name)
+        move_type = record.type if record else "Normal"  # Default
         
         # Get effectiveness against all types using the type chart
-        effectiveness = {}
-        all_types = [
-            "Normal", "Fire", "Water", "Electric", "Grass", "Ice", "Fighting", 
-            "Poison", "Ground", "Flying", "Psychic", "Bug", "Rock", "Ghost", 
-            "Dragon", "Dark", "Steel", "Fairy"
-        ]
-        
-        if move_type in self.type_chart:
-            for defending_type in all_types:
-                if defending_type in self.type_chart[move_type]:
-                    effectiveness[defending_type] = self.type_chart[move_type][defending_type]
-                else:
-                    effectiveness[defending_type] = "1"  # Default to neutral if not specified
+        effectiveness = self.type_chart.effectiveness(move_type)
+        coverage = self.type_chart.coverage([move_type])
         
         return {
             "move": move_name,
             "type": move_type,
-            "effectiveness": effectiveness
+            "details": record.to_dict() if record else {},
+            "effectiveness": effectiveness,
+            "super_effective": self.type_chart.mask_types(coverage.super_effective),
+            "resisted": self.type_chart.mask_types(coverage.resisted),
+            "immune": self.type_chart.mask_types(coverage.immune)
         }
     
     def get_decision(self):
@@ -1216,9 +1275,9 @@ class ContextBuilder:
         
         if switch_analysis.get("should_switch", False):
             # Find the best Pokemon to switch to
-            opponent_active = self.battle_state["opponent"]["active"]
+            opponent_active = self.battle_state["opponent"].active
             if opponent_active:
-                opponent_name = opponent_active.get("details", "").split(",")[0]
+                opponent_name = opponent_active.species
                 switch_suggestion = self.suggest_switch(opponent_name)
                 
                 # Get the target Pokemon name, ensuring it's a string
@@ -1227,10 +1286,10 @@ class ContextBuilder:
                     target_pokemon = switch_suggestion["switch_options"][0].get("pokemon", "")
                 
                 # If no valid target found, use the first available Pokemon from the team
-                if not target_pokemon and self.battle_state["player"]["team"]:
-                    for pokemon in self.battle_state["player"]["team"]:
-                        if not pokemon.get("active", False) and "fnt" not in pokemon.get("hp", ""):
-                            target_pokemon = pokemon.get("details", "").split(",")[0]
+                if not target_pokemon:
+                    for pokemon in self.battle_state["player"].team:
+                        if not pokemon.active and not pokemon.fainted:
+                            target_pokemon = pokemon.species
                             break
                 
                 # Ensure target is a string
@@ -1262,11 +1321,9 @@ class ContextBuilder:
         
         # Fallback - ensure we return a valid move string
         default_move = ""
-        if self.battle_state["player"]["active"] and self.battle_state["player"]["active"].get("moves"):
-            if isinstance(self.battle_state["player"]["active"]["moves"][0], dict):
-                default_move = self.battle_state["player"]["active"]["moves"][0].get("move", "")
-            elif isinstance(self.battle_state["player"]["active"]["moves"][0], str):
-                default_move = self.battle_state["player"]["active"]["moves"][0]
+        player_active = self.battle_state["player"].active
+        if player_active and player_active.moves:
+            default_move = player_active.moves[0].name
         
         if not default_move:
             default_move = "default"
@@ -0,0 +1,171 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from name_resolver import to_id
+
+# Random battle sets use 84 EVs and 31 IVs unless the set overrides them
+RANDBATS_EV = 84
+RANDBATS_IV = 31
+
+# Short stat keys (requests, randbats EVs/IVs) -> stat keys used by SpeciesRecord
+STAT_KEYS = {
+    "hp": "hp",
+    "atk": "attack",
+    "def": "defense",
+    "spa": "sp_attack",
+    "spd": "sp_defense",
+    "spe": "speed",
+}
+
+WEATHER_IDS = {
+    "raindance": "rain", "rain": "rain", "primordialsea": "rain",
+    "sunnyday": "sun", "sun": "sun", "desolateland": "sun",
+}
+
+CRIT_CHANCE = 1 / 24
+CRIT_MULTIPLIER = 1.5
+# The 16 damage rolls, 85% to 100%
+ROLLS = np.arange(85, 101, dtype=np.float32) / 100
+
+
+def compute_stats(base_stats: Dict[str, int], level, evs=None, ivs=None) -> Dict[str, int]:
+    """In-battle stats at a level with randbats EVs/IVs (neutral nature)"""
+    level = level or 100
+    stats = {}
+    for short, stat in STAT_KEYS.items():
+        base = base_stats.get(stat, 0)
+        ev = (evs or {}).get(short, RANDBATS_EV)
+        iv = (ivs or {}).get(short, RANDBATS_IV)
+        core = (2 * base + iv + ev // 4) * level // 100
+        stats[stat] = core + level + 10 if stat == "hp" else core + 5
+    return stats
+
+
+@dataclass
+class Combatant:
+    """One side of a damage calculation: level, typing, in-battle stats and current HP"""
+    name: str
+    level: int
+    types: Tuple[str, ...]
+    stats: Dict[str, int]
+    current_hp: Optional[int] = None
+    burned: bool = False
+    boosts: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def max_hp(self) -> int:
+        return max(1, self.stats.get("hp", 1))
+
+    @property
+    def hp(self) -> int:
+        return self.max_hp if self.current_hp is None else self.current_hp
+
+
+@dataclass
+class DamageTable:
+    """Damage of every (move, target) pair as (moves, targets) arrays"""
+    moves: List[str]
+    targets: List[str]
+    min_percent: np.ndarray
+    max_percent: np.ndarray
+    ko_probability: np.ndarray
+
+    def to_dict(self) -> Dict:
+        return {
+            move: {
+                target: {
+                    "min_percent": round(float(self.min_percent[i, j]), 1),
+                    "max_percent": round(float(self.max_percent[i, j]), 1),
+                    "ko_probability": round(float(self.ko_probability[i, j]), 3)
+                }
+                for j, target in enumerate(self.targets)
+            }
+            for i, move in enumerate(self.moves)
+        }
+
+
+def _boost(stat, stage):
+    stage = max(-6, min(6, stage or 0))
+    return stat * (2 + stage) / 2 if stage >= 0 else stat * 2 / (2 - stage)
+
+
+class DamageCalculator:
+    """
+    Vectorized damage ranges for one attacker's moves against many targets.
+
+    Every (move, target, roll) combination is evaluated in one NumPy pass
+    using the standard damage formula with STAB, type effectiveness, rain
+    and sun, burn, critical hits and the 85-100% random roll. KO probability
+    is the chance a hit (accuracy included, crits weighted 1/24) deals at
+    least the target's current HP. Moves without a fixed base power count
+    as zero damage.
+    """
+
+    def __init__(self, type_chart):
+        self.type_chart = type_chart
+
+    def calculate(self, attacker: Combatant, moves: Sequence, defenders: Sequence[Combatant],
+                  weather=None, names: Optional[Sequence[str]] = None) -> DamageTable:
+        """`moves` are MoveRecords (None for unknown moves); `names` label the rows"""
+        n_moves, n_targets = len(moves), len(defenders)
+        names = list(names) if names is not None else [move.name if move else "" for move in moves]
+        if not n_moves or not n_targets:
+            empty = np.zeros((n_moves, n_targets), dtype=np.float32)
+            return DamageTable(names, [d.name for d in defenders], empty, empty.copy(), empty.copy())
+
+        chart = self.type_chart
+        move_types = [move.type if move else "Normal" for move in moves]
+        power = np.array([move.base_power if move and move.is_damaging else 0 for move in moves], dtype=np.float32)
+        physical = np.array([bool(move) and move.category == "Physical" for move in moves])
+        accuracy = np.array([
+            1.0 if not move or move.accuracy is None else move.accuracy / 100 for move in moves
+        ], dtype=np.float32)
+
+        # Attacking stat per move, defending stat per (move, target)
+        attack = np.where(
+            physical,
+            _boost(attacker.stats.get("attack", 1), attacker.boosts.get("atk")),
+            _boost(attacker.stats.get("sp_attack", 1), attacker.boosts.get("spa"))
+        ).astype(np.float32)
+        defense = np.array([_boost(d.stats.get("defense", 1), d.boosts.get("def")) for d in defenders], dtype=np.float32)
+        sp_defense = np.array([_boost(d.stats.get("sp_defense", 1), d.boosts.get("spd")) for d in defenders], dtype=np.float32)
+        defending = np.where(physical[:, None], defense[None, :], sp_defense[None, :])
+        defending = np.maximum(defending, 1)
+
+        level_factor = np.floor(2 * attacker.level / 5 + 2)
+        base = np.floor(np.floor(level_factor * power[:, None] * attack[:, None] / defending) / 50) + 2
+
+        # Multipliers that depend only on the move
+        attacker_types = {chart.normalize(t) for t in attacker.types}
+        modifier = np.where([chart.normalize(t) in attacker_types for t in move_types], 1.5, 1.0).astype(np.float32)
+        weather = WEATHER_IDS.get(to_id(weather or ""))
+        if weather:
+            boosted, weakened = ("Water", "Fire") if weather == "rain" else ("Fire", "Water")
+            modifier *= np.array([1.5 if t == boosted else 0.5 if t == weakened else 1.0 for t in move_types], dtype=np.float32)
+        if attacker.burned:
+            modifier *= np.where(physical, 0.5, 1.0).astype(np.float32)
+
+        effectiveness = chart.multipliers(move_types, [d.types for d in defenders])
+        modifier = modifier[:, None] * effectiveness
+        modifier[power == 0] = 0
+
+        # (moves, targets, rolls) for normal hits and crits
+        normal = np.floor(np.floor(base[..., None] * ROLLS) * modifier[..., None])
+        crit = np.floor(np.floor(np.floor(base * CRIT_MULTIPLIER)[..., None] * ROLLS) * modifier[..., None])
+
+        max_hp = np.array([d.max_hp for d in defenders], dtype=np.float32)
+        current_hp = np.array([d.hp for d in defenders], dtype=np.float32)
+        ko_normal = (normal >= current_hp[None, :, None]).mean(axis=2)
+        ko_crit = (crit >= current_hp[None, :, None]).mean(axis=2)
+        ko_probability = accuracy[:, None] * ((1 - CRIT_CHANCE) * ko_normal + CRIT_CHANCE * ko_crit)
+        ko_probability[power == 0] = 0
+
+        return DamageTable(
+            moves=names,
+            targets=[d.name for d in defenders],
+            min_percent=100 * normal[..., 0] / max_hp[None, :],
+            max_percent=100 * normal[..., -1] / max_hp[None, :],
+            ko_probability=ko_probability
+        )
@@ -0,0 +1,188 @@
+import atexit
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+CACHE_DIRECTORY = os.getenv("EMBEDDING_CACHE_DIR", ".embedding_cache")
+DEFAULT_MAX_ENTRIES = 50000
+# New entries written before index.json is rewritten
+DEFAULT_FLUSH_EVERY = 256
+KEY_BYTES = 32
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Disk-backed embedding cache that wraps another embedding function.
+
+    Vectors are keyed by (model, sha256(text)) and stored as rows of a float32
+    memmap; index.json maps each key to its row offset in LRU order. Once
+    `max_entries` rows are used, the least recently used row is overwritten.
+    Drop-in anywhere an `embedding_function` is accepted.
+
+    index.json is rewritten every `flush_every` new entries, on flush() or
+    close(), and at exit, not on every miss. Each row also stores its key's
+    digest in keys.bin, so index entries whose row was reused after the last
+    index write are detected and dropped on load.
+    """
+
+    def __init__(self, underlying: Embeddings, cache_dir=CACHE_DIRECTORY, max_entries=DEFAULT_MAX_ENTRIES,
+                 flush_every=DEFAULT_FLUSH_EVERY):
+        self.underlying = underlying
+        self.model = getattr(underlying, "model", None) or type(underlying).__name__
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._dir = os.path.join(cache_dir, re.sub(r"[^a-zA-Z0-9._-]", "-", self.model))
+        self._vectors_path = os.path.join(self._dir, "vectors.f32")
+        self._keys_path = os.path.join(self._dir, "keys.bin")
+        self._index_path = os.path.join(self._dir, "index.json")
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._dim = None
+        self._rows = 0
+        self._vectors = None
+        self._keys = None
+        self._free_rows = []
+        self._high_water = 0
+        self._pending = 0
+        self._load()
+        atexit.register(self.flush)
+
+    def _load(self):
+        try:
+            with open(self._index_path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        if saved.get("model") != self.model or not saved.get("dim"):
+            return
+        try:
+            rows = os.path.getsize(self._vectors_path) // (4 * saved["dim"])
+            key_rows = os.path.getsize(self._keys_path) // KEY_BYTES
+        except OSError:
+            return
+        self._dim = saved["dim"]
+        self._rows = min(rows, key_rows)
+        if self._rows:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self._rows, self._dim))
+            self._keys = np.memmap(self._keys_path, dtype=np.uint8, mode="r+", shape=(self._rows, KEY_BYTES))
+        # Entries are saved least recently used first; drop any beyond a shrunken limit,
+        # and any whose row now holds a different key
+        for key, row in saved.get("entries", [])[-self.max_entries:]:
+            if row < self._rows and self._keys[row].tobytes() == bytes.fromhex(key):
+                self._index[key] = row
+        used = set(self._index.values())
+        self._high_water = max(used) + 1 if used else 0
+        self._free_rows = [row for row in range(self._high_water) if row not in used]
+
+    def _save(self):
+        os.makedirs(self._dir, exist_ok=True)
+        tmp_path = self._index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"model": self.model, "dim": self._dim, "entries": list(self._index.items())}, f)
+        os.replace(tmp_path, self._index_path)
+
+    def _ensure_rows(self, rows_needed):
+        """Grow the memmap file geometrically, up to max_entries rows"""
+        if rows_needed <= self._rows:
+            return
+        new_rows = min(self.max_entries, max(rows_needed, self._rows * 2, 1024))
+        os.makedirs(self._dir, exist_ok=True)
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._keys.flush()
+            self._vectors = self._keys = None
+        with open(self._vectors_path, "ab") as f:
+            f.truncate(new_rows * self._dim * 4)
+        with open(self._keys_path, "ab") as f:
+            f.truncate(new_rows * KEY_BYTES)
+        self._rows = new_rows
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(self._rows, self._dim))
+        self._keys = np.memmap(self._keys_path, dtype=np.uint8, mode="r+", shape=(self._rows, KEY_BYTES))
+
+    def _key(self, text) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _next_row(self) -> int:
+        """Free row for a new vector, evicting the least recently used entry when full"""
+        if len(self._index) >= self.max_entries:
+            _, row = self._index.popitem(last=False)
+            return row
+        if self._free_rows:
+            return self._free_rows.pop()
+        row = self._high_water
+        self._high_water += 1
+        self._ensure_rows(row + 1)
+        return row
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        results = [None] * len(texts)
+        missing = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                row = self._index.get(key)
+                if row is not None:
+                    self._index.move_to_end(key)
+                    results[i] = self._vectors[row].tolist()
+                    self.hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+
+        if not missing:
+            return results
+
+        # Embed each distinct missing text once, outside the lock
+        missing_keys = list(missing)
+        vectors = self.underlying.embed_documents([texts[missing[key][0]] for key in missing_keys])
+
+        with self._lock:
+            self.misses += len(missing_keys)
+            if self._dim is None:
+                self._dim = len(vectors[0])
+            for key, vector in zip(missing_keys, vectors):
+                for i in missing[key]:
+                    results[i] = list(vector)
+                if key in self._index:
+                    continue
+                row = self._next_row()
+                self._vectors[row] = np.asarray(vector, dtype=np.float32)
+                self._keys[row] = np.frombuffer(bytes.fromhex(key), dtype=np.uint8)
+                self._index[key] = row
+                self._pending += 1
+            if self._pending >= self.flush_every:
+                self._flush()
+
+        return results
+
+    def _flush(self):
+        if not self._pending or self._vectors is None:
+            return
+        self._vectors.flush()
+        self._keys.flush()
+        self._save()
+        self._pending = 0
+
+    def flush(self):
+        """Write new vectors and the index to disk"""
+        with self._lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    def stats(self):
+        return {"entries": len(self._index), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,102 @@
+import os
+from typing import Callable, Dict, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from embedding_cache import CachedEmbeddings
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+
+_PRIME = np.uint64(1099511628211)
+_MIX = np.uint64(0xff51afd7ed558ccd)
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Local, deterministic embeddings from hashed character n-grams.
+
+    Each text is padded, lowercased and split into 2-4 byte n-grams; the
+    n-grams are hashed with a vectorized polynomial hash into `dim` signed
+    buckets, counts are log-scaled and the vector is L2-normalized, so cosine
+    similarity is a sparse n-gram overlap score. No network, millisecond latency.
+    """
+
+    def __init__(self, dim=1024, min_n=2, max_n=4):
+        self.dim = dim
+        self.min_n = min_n
+        self.max_n = max_n
+        self.model = f"hashing-ngram-{min_n}-{max_n}-{dim}"
+
+    def _ngram_hashes(self, text) -> np.ndarray:
+        codes = np.frombuffer(f" {text.lower()} ".encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+        hashes = []
+        for n in range(self.min_n, self.max_n + 1):
+            count = len(codes) - n + 1
+            if count <= 0:
+                continue
+            h = np.full(count, n, dtype=np.uint64)
+            for k in range(n):
+                h = h * _PRIME + codes[k:k + count]
+            hashes.append(h)
+        if not hashes:
+            return np.zeros(0, dtype=np.uint64)
+        h = np.concatenate(hashes)
+        # Finalize so low bits (bucket) and the top bit (sign) are well mixed
+        h ^= h >> np.uint64(33)
+        h *= _MIX
+        h ^= h >> np.uint64(33)
+        return h
+
+    def _embed(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            h = self._ngram_hashes(text or "")
+            rows.append(np.full(len(h), row, dtype=np.intp))
+            columns.append((h % np.uint64(self.dim)).astype(np.intp))
+            signs.append(np.where(h >> np.uint64(63), -1.0, 1.0).astype(np.float32))
+        if rows:
+            np.add.at(vectors, (np.concatenate(rows), np.concatenate(columns)), np.concatenate(signs))
+
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0].tolist()
+
+
+def _openai_backend(model=None) -> Embeddings:
+    from langchain_openai.embeddings import OpenAIEmbeddings
+    kwargs = {"openai_api_key": os.getenv("OPENAI_API_KEY")}
+    if model:
+        kwargs["model"] = model
+    return CachedEmbeddings(OpenAIEmbeddings(**kwargs))
+
+
+def _local_backend(model=None) -> Embeddings:
+    return HashingEmbeddings()
+
+
+EMBEDDING_BACKENDS: Dict[str, Callable[..., Embeddings]] = {
+    "openai": _openai_backend,
+    "local": _local_backend,
+}
+
+
+def get_embeddings(backend=None, model=None) -> Embeddings:
+    """
+    Build the configured embedding backend.
+
+    `backend` defaults to the EMBEDDING_BACKEND environment variable
+    ("openai" or "local"); `model` only applies to backends that take one.
+    """
+    backend = backend or EMBEDDING_BACKEND
+    if backend not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {sorted(EMBEDDING_BACKENDS)}")
+    return EMBEDDING_BACKENDS[backend](model=model)
@@ -0,0 +1,128 @@
+import json
+import threading
+from types import MappingProxyType
+
+from dotenv import load_dotenv
+
+from move_index import MoveIndex
+from randbats_index import RandbatsIndex
+from species_index import SpeciesIndex
+from speed_tiers import SpeedTiers
+from type_chart import TypeChart
+
+load_dotenv()
+
+RANDBATS_PATH = "gen9randombattle.json"
+POKEDEX_PATH = "pokedex.csv"
+TYPING_CHART_PATH = "typing_chart.csv"
+MOVES_PATH = "moves.json"
+FORMES_PATH = "formes.json"
+
+
+def _randbats_documents(rand_bats):
+    """One Document per randbats species, holding its JSON set data"""
+    from langchain_core.documents import Document
+    return [
+        Document(page_content=json.dumps({pokemon_name: pokemon_data}))
+        for pokemon_name, pokemon_data in rand_bats.items()
+    ]
+
+
+def _move_documents(move_index):
+    """One Document per move, used only to resolve unknown move names"""
+    from langchain_core.documents import Document
+    return [
+        Document(page_content=f"move: {record.name}\nid: {record.id}")
+        for record in move_index.records()
+    ]
+
+
+def _csv_documents(csv_path):
+    """One Document per CSV row, in CSVLoader's "column: value" format"""
+    from langchain_community.document_loaders import CSVLoader
+    from langchain_core.documents import Document
+    return [Document(page_content=row.page_content) for row in CSVLoader(csv_path).load()]
+
+
+class KnowledgeBase:
+    """
+    Immutable reference data shared by every ContextBuilder in the process.
+
+    The exact-match indexes are built when the knowledge base is created; the
+    vector collections are only opened the first time a fallback search needs
+    them. Use get_knowledge_base() rather than constructing one directly.
+    """
+
+    _frozen = False
+
+    def __init__(self, embeddings=None):
+        with open(RANDBATS_PATH) as f:
+            rand_bats = json.load(f)
+
+        self.rand_bats = MappingProxyType(rand_bats)
+        self.species_index = SpeciesIndex(POKEDEX_PATH, rand_bats=rand_bats, formes_path=FORMES_PATH)
+        self.type_chart = TypeChart(TYPING_CHART_PATH)
+        self.move_index = MoveIndex(MOVES_PATH)
+        self.randbats_index = RandbatsIndex(rand_bats, resolver=self.species_index.resolver)
+        self.speed_tiers = SpeedTiers(self.species_index, rand_bats)
+
+        self._embeddings = embeddings
+        self._collections = {}
+        self._collections_lock = threading.RLock()
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise AttributeError(f"KnowledgeBase is immutable; cannot set {name}")
+        super().__setattr__(name, value)
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            with self._collections_lock:
+                if self._embeddings is None:
+                    # Backend is chosen by EMBEDDING_BACKEND ("openai" or "local")
+                    from embeddings import get_embeddings
+                    object.__setattr__(self, "_embeddings", get_embeddings())
+        return self._embeddings
+
+    def _collection(self, name, source_path, build_documents):
+        """Open a persisted collection once, on first use"""
+        if name not in self._collections:
+            with self._collections_lock:
+                if name not in self._collections:
+                    from vector_store import open_collection
+                    self._collections[name] = open_collection(
+                        name, build_documents(), self.embeddings, [source_path]
+                    )
+        return self._collections[name]
+
+    @property
+    def pokedex(self):
+        return self._collection("Pokemon-Information", POKEDEX_PATH, lambda: _csv_documents(POKEDEX_PATH))
+
+    @property
+    def meta_db(self):
+        return self._collection("Common-Movesets", RANDBATS_PATH, lambda: _randbats_documents(self.rand_bats))
+
+    @property
+    def typing_matchups(self):
+        return self._collection("Typing-Matchups", TYPING_CHART_PATH, lambda: _csv_documents(TYPING_CHART_PATH))
+
+    @property
+    def moves_db(self):
+        return self._collection("Move-Names", MOVES_PATH, lambda: _move_documents(self.move_index))
+
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """Return the process-wide KnowledgeBase, building it on first use"""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _knowledge_base_lock:
+            if _knowledge_base is None:
+                _knowledge_base = KnowledgeBase()
+    return _knowledge_base
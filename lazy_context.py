@@ -0,0 +1,48 @@
+from collections.abc import Mapping
+from typing import Any, Callable, Dict
+
+
+class LazyContext(Mapping):
+    """
+    Read-only mapping whose sections are computed on first access.
+
+    Each section is a zero-argument callable; its result is cached so later
+    reads are free, and sections nobody reads are never computed. Sections
+    are evaluated against the ContextBuilder's state at access time. Call
+    materialize() to get a plain dict (e.g. for json.dumps).
+    """
+
+    def __init__(self, sections: Dict[str, Callable[[], Any]]):
+        self._sections = dict(sections)
+        self._values: Dict[str, Any] = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            compute = self._sections[key]
+        value = self._values[key] = compute()
+        return value
+
+    def __iter__(self):
+        return iter(self._sections)
+
+    def __len__(self):
+        return len(self._sections)
+
+    def __contains__(self, key):
+        return key in self._sections
+
+    def is_computed(self, key) -> bool:
+        return key in self._values
+
+    def materialize(self) -> Dict[str, Any]:
+        """Compute every section and return the context as nested plain dicts"""
+        return {
+            key: value.materialize() if isinstance(value, LazyContext) else value
+            for key, value in self.items()
+        }
+
+    def __repr__(self):
+        computed = ", ".join(key for key in self._sections if key in self._values)
+        return f"LazyContext(sections={list(self._sections)}, computed=[{computed}])"
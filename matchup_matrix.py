@@ -0,0 +1,180 @@
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class MatchupMatrix:
+    """
+    Pairwise scores between the opponent's revealed Pokemon (rows) and our
+    team (columns), maintained for one battle.
+
+    Rows are appended when an opponent is revealed and masked when it faints;
+    columns are set once from our team. Each score is an (opponents, ours)
+    float array, so threat levels and switch rankings are slices and
+    reductions instead of nested loops over details lookups:
+
+      offense        best multiplier of our damaging moves against them
+      defense        best multiplier of their STAB types against us
+      we_hit_weak    how many of our types they are weak to
+      they_hit_weak  how many of their types we are weak to
+      se_coverage    how many of their types our moves hit super effectively
+      speed          +1 if we outspeed, -1 if they do, 0 on a tie
+    """
+
+    SCORES = ("offense", "defense", "we_hit_weak", "they_hit_weak", "se_coverage", "speed")
+
+    def __init__(self, type_chart, capacity=6):
+        self.type_chart = type_chart
+        self.capacity = capacity
+
+        self.player_keys: tuple = ()
+        self.player_column: Dict[object, int] = {}
+        self.player_types: List[List[str]] = []
+        self.player_alive = np.zeros(0, dtype=bool)
+        self._player_speed = np.zeros(0, dtype=np.float32)
+        self._player_type_rows = np.zeros(0, dtype=np.intp)
+        self._player_type_columns = np.zeros(0, dtype=np.intp)
+        self._move_rows = np.zeros(0, dtype=np.intp)
+        self._move_columns = np.zeros(0, dtype=np.intp)
+
+        self.opponent_keys: List[object] = []
+        self.opponent_row: Dict[object, int] = {}
+        self.opponent_types: List[List[str]] = []
+        self._opponent_speed = np.zeros(capacity, dtype=np.float32)
+        self._stat_factor = np.zeros(capacity, dtype=np.float32)
+        self._opponent_alive = np.zeros(capacity, dtype=bool)
+        self._scores = {name: np.zeros((capacity, 0), dtype=np.float32) for name in self.SCORES}
+
+    def set_player_team(self, keys: Sequence, types: Sequence[Sequence[str]],
+                        move_types: Sequence[Sequence[str]], speeds: Sequence[float]):
+        """Set our columns (types, damaging move types, speed per member) and rescore every row"""
+        self.player_keys = tuple(keys)
+        self.player_column = {key: j for j, key in enumerate(self.player_keys)}
+        self.player_types = [list(t) for t in types]
+        self.player_alive = np.ones(len(self.player_keys), dtype=bool)
+        self._player_speed = np.asarray(speeds, dtype=np.float32)
+
+        chart = self.type_chart
+        self._player_type_rows = np.array([chart.attack_index(t) for ts in self.player_types for t in ts], dtype=np.intp)
+        self._player_type_columns = np.array([j for j, ts in enumerate(self.player_types) for _ in ts], dtype=np.intp)
+        self._move_rows = np.array([chart.attack_index(t) for ts in move_types for t in ts], dtype=np.intp)
+        self._move_columns = np.array([j for j, ts in enumerate(move_types) for _ in ts], dtype=np.intp)
+
+        for name in self.SCORES:
+            self._scores[name] = np.zeros((self.capacity, len(self.player_keys)), dtype=np.float32)
+        for row in range(len(self.opponent_keys)):
+            self._score_row(row)
+
+    def add_opponent(self, key, types: Sequence[str], speed: float, stats_total: float) -> int:
+        """Row for an opponent, appended and scored the first time it is revealed"""
+        row = self.opponent_row.get(key)
+        if row is not None:
+            return row
+
+        row = len(self.opponent_keys)
+        if row == self.capacity:
+            self._grow()
+        self.opponent_keys.append(key)
+        self.opponent_row[key] = row
+        self.opponent_types.append(list(types))
+        self._opponent_speed[row] = speed
+        # Base stat total on a 0-3 scale
+        self._stat_factor[row] = min(3, max(0, stats_total / 200))
+        self._opponent_alive[row] = True
+        self._score_row(row)
+        return row
+
+    def _grow(self):
+        self.capacity *= 2
+        self._opponent_speed = np.resize(self._opponent_speed, self.capacity)
+        self._stat_factor = np.resize(self._stat_factor, self.capacity)
+        self._opponent_alive = np.resize(self._opponent_alive, self.capacity)
+        for name, scores in self._scores.items():
+            grown = np.zeros((self.capacity, scores.shape[1]), dtype=np.float32)
+            grown[:scores.shape[0]] = scores
+            self._scores[name] = grown
+
+    def _score_row(self, row):
+        """Score one opponent against every column at once"""
+        n = len(self.player_keys)
+        if not n:
+            return
+        chart = self.type_chart
+        types = self.opponent_types[row]
+        defender = chart.defender_index(types)
+        table = chart._attack_table
+
+        # Their STAB types against each of our typings
+        if types:
+            they_hit = chart.multipliers(types, self.player_types)
+            self._scores["defense"][row] = they_hit.max(axis=0)
+            self._scores["they_hit_weak"][row] = (they_hit > 1).sum(axis=0)
+        else:
+            self._scores["defense"][row] = 1.0
+            self._scores["they_hit_weak"][row] = 0
+
+        # Our types and moves against their typing, reduced per column
+        we_hit = table[self._player_type_rows, defender] > 1
+        self._scores["we_hit_weak"][row] = np.bincount(self._player_type_columns, weights=we_hit, minlength=n)
+
+        offense = np.zeros(n, dtype=np.float32)
+        np.maximum.at(offense, self._move_columns, table[self._move_rows, defender])
+        self._scores["offense"][row] = offense
+
+        covered = np.zeros((n, len(types)), dtype=bool)
+        if types and len(self._move_rows):
+            single = np.array([chart.defender_index([t]) for t in types], dtype=np.intp)
+            np.logical_or.at(covered, self._move_columns, table[np.ix_(self._move_rows, single)] > 1)
+        self._scores["se_coverage"][row] = covered.sum(axis=1)
+
+        self._scores["speed"][row] = np.sign(self._player_speed - self._opponent_speed[row])
+
+    def set_fainted(self, key, fainted=True):
+        """Mask an opponent row or one of our columns"""
+        if key in self.opponent_row:
+            self._opponent_alive[self.opponent_row[key]] = not fainted
+        if key in self.player_column:
+            self.player_alive[self.player_column[key]] = not fainted
+
+    @property
+    def opponent_alive(self) -> np.ndarray:
+        return self._opponent_alive[:len(self.opponent_keys)]
+
+    def scores(self, name) -> np.ndarray:
+        """(revealed opponents, our team) view of one score"""
+        return self._scores[name][:len(self.opponent_keys)]
+
+    def threat_levels(self) -> np.ndarray:
+        """Per-opponent threat: our living members weak to their types, plus a stat factor"""
+        weak = self.scores("they_hit_weak")[:, self.player_alive].sum(axis=1)
+        threat = weak + self._stat_factor[:len(self.opponent_keys)]
+        return np.where(self.opponent_alive, threat, 0.0)
+
+    def threat(self, key) -> float:
+        row = self.opponent_row.get(key)
+        return float(self.threat_levels()[row]) if row is not None else 0.0
+
+    def switch_scores(self, key, exclude: Optional[object] = None) -> Dict[object, float]:
+        """Our living members scored against one opponent: types that don't hit us weakly plus SE coverage"""
+        row = self.opponent_row.get(key)
+        if row is None:
+            return {}
+        resists = len(self.opponent_types[row]) - self.scores("they_hit_weak")[row]
+        scores = resists + self.scores("se_coverage")[row]
+        return {
+            self.player_keys[j]: float(scores[j])
+            for j in np.flatnonzero(self.player_alive)
+            if self.player_keys[j] != exclude
+        }
+
+    def resistance_scores(self, player_key, exclude: Optional[object] = None) -> Dict[object, float]:
+        """Living opponents scored by how many of our member's types they are not weak to"""
+        column = self.player_column.get(player_key)
+        if column is None:
+            return {}
+        scores = len(self.player_types[column]) - self.scores("we_hit_weak")[:, column]
+        return {
+            self.opponent_keys[i]: float(scores[i])
+            for i in np.flatnonzero(self.opponent_alive)
+            if self.opponent_keys[i] != exclude
+        }
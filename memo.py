@@ -0,0 +1,58 @@
+from typing import Any, Callable, Dict, Hashable
+
+
+class MemoScope:
+    """
+    A named memo cache with hit/miss counters and explicit invalidation.
+
+    ContextBuilder keeps one scope for the whole battle (static facts such as
+    species details) and one that is cleared at the start of every context
+    build (derived facts such as the current matchup). Keys are tuples whose
+    first element names the kind of fact, so related entries can be dropped
+    together with `invalidate("kind", ...)`.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._cache: Dict[Hashable, Any] = {}
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        try:
+            value = self._cache[key]
+        except KeyError:
+            self.misses += 1
+            value = self._cache[key] = compute()
+            return value
+        self.hits += 1
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        self._cache[key] = value
+
+    def __contains__(self, key):
+        return key in self._cache
+
+    def invalidate(self, *prefix) -> int:
+        """Drop every entry whose tuple key starts with `prefix` (all entries if empty)"""
+        if not prefix:
+            dropped = len(self._cache)
+            self._cache.clear()
+            return dropped
+        stale = [
+            key for key in self._cache
+            if isinstance(key, tuple) and key[:len(prefix)] == prefix
+        ]
+        for key in stale:
+            del self._cache[key]
+        return len(stale)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+    def __len__(self):
+        return len(self._cache)
@@ -0,0 +1,98 @@
+import json
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+from species_index import to_id
+
+
+@dataclass(frozen=True)
+class MoveRecord:
+    """Offline move data: typing, power, category, priority, accuracy and effect flags"""
+    id: str
+    name: str
+    type: str
+    base_power: int
+    category: str
+    priority: int = 0
+    accuracy: Optional[int] = None  # None means the move never misses
+    pp: int = 0
+    target: str = "normal"
+    secondary_chance: int = 0
+    flags: FrozenSet[str] = frozenset()
+
+    @property
+    def is_damaging(self) -> bool:
+        return self.category != "Status"
+
+    def has_flag(self, flag) -> bool:
+        return flag in self.flags
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "type": self.type,
+            "base_power": self.base_power,
+            "category": self.category,
+            "priority": self.priority,
+            "accuracy": self.accuracy,
+            "secondary_chance": self.secondary_chance,
+            "flags": sorted(self.flags)
+        }
+
+
+def move_name(move) -> str:
+    """Extract a move name from a request entry (dict or plain string) or a MoveSlot"""
+    if isinstance(move, dict):
+        return move.get("move") or move.get("id") or ""
+    if hasattr(move, "name"):
+        return move.name
+    return str(move) if move else ""
+
+
+class MoveIndex:
+    """
+    Move table keyed by Showdown move ID, loaded once from moves.json.
+
+    moves.json holds every standard Gen 9 move (exported from the Showdown
+    data shipped with poke-env) so move lookups never need a vector search.
+    """
+
+    def __init__(self, json_path="moves.json"):
+        with open(json_path) as f:
+            raw_moves = json.load(f)
+
+        self._moves: Dict[str, MoveRecord] = {}
+        for move_id, data in raw_moves.items():
+            self._moves[move_id] = MoveRecord(
+                id=move_id,
+                name=data["name"],
+                type=data["type"],
+                base_power=data.get("basePower", 0),
+                category=data.get("category", "Status"),
+                priority=data.get("priority", 0),
+                accuracy=data.get("accuracy"),
+                pp=data.get("pp", 0),
+                target=data.get("target", "normal"),
+                secondary_chance=data.get("secondaryChance", 0),
+                flags=frozenset(data.get("flags", []))
+            )
+
+    def get(self, move_id) -> Optional[MoveRecord]:
+        """Look up a move by Showdown ID, display name or request entry"""
+        return self._moves.get(to_id(move_name(move_id)))
+
+    def get_many(self, moves: Iterable) -> List[Optional[MoveRecord]]:
+        return [self.get(move) for move in moves]
+
+    def records(self) -> List[MoveRecord]:
+        return list(self._moves.values())
+
+    def type_of(self, move, default="Normal") -> str:
+        record = self.get(move)
+        return record.type if record else default
+
+    def __contains__(self, move_id):
+        return self.get(move_id) is not None
+
+    def __len__(self):
+        return len(self._moves)
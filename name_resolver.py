@@ -0,0 +1,175 @@
+import heapq
+import re
+from functools import lru_cache
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional
+
+# Formes Showdown reports that share data with another entry (battle-only
+# changes, cosmetic formes, Tera formes). Keys and values are Showdown IDs.
+FORME_ALIASES = {
+    "aegislashblade": "aegislash",
+    "cramorantgulping": "cramorant",
+    "cramorantgorging": "cramorant",
+    "darmanitanzen": "darmanitan",
+    "darmanitangalarzen": "darmanitangalar",
+    "eiscuenoice": "eiscue",
+    "greninjaash": "greninjabond",
+    "meloettapirouette": "meloetta",
+    "mimikyubusted": "mimikyu",
+    "miniormeteor": "minior",
+    "morpekohangry": "morpeko",
+    "palafinhero": "palafin",
+    "terapagosterastal": "terapagos",
+    "terapagosstellar": "terapagos",
+    "wishiwashischool": "wishiwashi",
+    "zygardecomplete": "zygarde",
+    "ogerpontealtera": "ogerpon",
+    "ogerponwellspringtera": "ogerponwellspring",
+    "ogerponhearthflametera": "ogerponhearthflame",
+    "ogerponcornerstonetera": "ogerponcornerstone",
+    "gastrodoneast": "gastrodon",
+    "shelloseast": "shellos",
+    "mausholdfour": "maushold",
+    "dudunsparcethreesegment": "dudunsparce",
+    "tatsugiridroopy": "tatsugiri",
+    "tatsugiristretchy": "tatsugiri",
+    "polteageistantique": "polteageist",
+    "sinistchamasterpiece": "sinistcha",
+    "poltchageistartisan": "poltchageist",
+    "toxtricitylowkey": "toxtricity",
+    "basculinbluestriped": "basculin",
+    "basculinwhitestriped": "basculin",
+    "squawkabillyblueplumage": "squawkabillyblue",
+    "squawkabillyyellowplumage": "squawkabillyyellow",
+    "squawkabillywhiteplumage": "squawkabillywhite",
+}
+
+# Trailing forme tokens that never change which entry applies
+IGNORED_SUFFIXES = {"*", "tera", "totem", "gmax"}
+
+# Trigram matches re-ranked by edit distance in closest()
+RERANK_CANDIDATES = 10
+
+
+def to_id(name: str) -> str:
+    """Convert a display name into a Showdown ID (lowercase, no punctuation)"""
+    if not name:
+        return ""
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def _trigrams(species_id) -> List[str]:
+    padded = f"  {species_id} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a, b) -> int:
+    """Levenshtein distance where swapping two adjacent letters counts as one edit"""
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+    return current[-1]
+
+
+class NameResolver:
+    """
+    Maps Showdown species names onto canonical IDs without any embeddings.
+
+    Resolution order: exact ID, the forme alias table, dropping ignored
+    suffixes ("Urshifu-*", "-Tera"), abbreviated forme tokens ("Tornadus-T"),
+    then a trigram inverted index for typos and unseen cosmetic variants,
+    re-ranked by edit distance so transpositions still match. An unknown
+    forme resolves to None rather than to its base species, whose typing and
+    stats may differ. Results are
+    memoized in a bounded LRU cache, so repeated lookups are a single hit.
+    """
+
+    def __init__(self, species_ids: Iterable[str], min_similarity=0.6, cache_size=4096):
+        self.species_ids = set(species_ids)
+        self.min_similarity = min_similarity
+        self.aliases: Dict[str, str] = {
+            alias: target for alias, target in FORME_ALIASES.items() if target in self.species_ids
+        }
+
+        self._trigram_index: Dict[str, List[str]] = defaultdict(list)
+        self._trigram_counts: Dict[str, int] = {}
+        for species_id in self.species_ids:
+            grams = set(_trigrams(species_id))
+            self._trigram_counts[species_id] = len(grams)
+            for gram in grams:
+                self._trigram_index[gram].append(species_id)
+
+        # Bounded, so garbage names off the socket can't grow it for the life of the process
+        self._resolve_cached = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def resolve(self, name) -> Optional[str]:
+        """Canonical species ID for a name or details string, or None"""
+        if not name:
+            return None
+        return self._resolve_cached(name.split(",")[0].strip())
+
+    def _resolve(self, name) -> Optional[str]:
+        species_id = to_id(name)
+        if species_id in self.species_ids:
+            return species_id
+        if species_id in self.aliases:
+            return self.aliases[species_id]
+
+        # Drop forme tokens that never change the entry, e.g. "Urshifu-*"
+        parts = name.split("-")
+        while len(parts) > 1 and to_id(parts[-1]) in IGNORED_SUFFIXES | {""}:
+            parts.pop()
+            species_id = to_id("-".join(parts))
+            if species_id in self.species_ids:
+                return species_id
+            if species_id in self.aliases:
+                return self.aliases[species_id]
+
+        # Abbreviated forme token of a known species, e.g. "Tornadus-T", "Rotom-W"
+        if len(parts) > 1:
+            prefix = to_id("-".join(parts[:-1]))
+            token = to_id(parts[-1])
+            if prefix in self.species_ids and token:
+                formes = [candidate for candidate in self.species_ids if candidate.startswith(prefix + token)]
+                # Entries extending another match ("urshifurapidstrikegmax") are the same forme
+                formes = [forme for forme in formes if not any(forme != other and forme.startswith(other) for other in formes)]
+                if len(formes) == 1:
+                    return formes[0]
+
+        match = self.closest(species_id)
+        # A forme token that matched nothing must not fall back to its base species
+        if len(parts) > 1 and match == to_id("-".join(parts[:-1])):
+            return None
+        return match
+
+    def closest(self, species_id) -> Optional[str]:
+        """
+        Best fuzzy match above min_similarity. The top trigram (Dice) matches
+        are re-ranked by edit distance, since a transposition ("Grachomp")
+        breaks several trigrams but is a single edit.
+        """
+        grams = set(_trigrams(species_id))
+        if not grams:
+            return None
+        shared = defaultdict(int)
+        for gram in grams:
+            for candidate in self._trigram_index.get(gram, ()):
+                shared[candidate] += 1
+
+        dice = {
+            candidate: 2 * count / (len(grams) + self._trigram_counts[candidate])
+            for candidate, count in shared.items()
+        }
+        best, best_key = None, None
+        for candidate in heapq.nlargest(RERANK_CANDIDATES, dice, key=lambda c: (dice[c], c)):
+            distance = edit_distance(species_id, candidate)
+            score = max(dice[candidate], 1 - distance / max(len(species_id), len(candidate)))
+            key = (-score, distance, candidate)
+            if best_key is None or key < best_key:
+                best, best_key = candidate, key
+        return best if best is not None and -best_key[0] >= self.min_similarity else None
@@ -0,0 +1,124 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from species_index import to_id
+
+
+@dataclass(frozen=True)
+class RandbatsSets:
+    """Compiled randbats sets for one species"""
+    id: str
+    name: str
+    level: Optional[int]
+    roles: Tuple[str, ...]
+    role_weights: np.ndarray        # (n_roles,), sums to 1
+    role_move_probs: np.ndarray     # (n_roles, n_moves) over the global move ID space
+    items: Dict[str, float] = field(default_factory=dict)
+    abilities: Dict[str, float] = field(default_factory=dict)
+    tera_types: Dict[str, float] = field(default_factory=dict)
+
+
+class RandbatsIndex:
+    """
+    gen9randombattle.json compiled into per-species probability arrays.
+
+    Every move that appears in any set gets a column in one global move ID
+    space, so a species' weighted move distribution is a single
+    `role_weights @ role_move_probs` product.
+    """
+
+    def __init__(self, rand_bats, resolver=None):
+        self.resolver = resolver
+        move_names = {}
+        for species_data in rand_bats.values():
+            for role_data in species_data.get("roles", {}).values():
+                for name in role_data.get("moves", {}):
+                    move_names.setdefault(to_id(name), name)
+
+        self.move_ids: List[str] = sorted(move_names)
+        self.move_names: List[str] = [move_names[move_id] for move_id in self.move_ids]
+        self.move_column: Dict[str, int] = {move_id: i for i, move_id in enumerate(self.move_ids)}
+
+        self._sets: Dict[str, RandbatsSets] = {}
+        for species_name, species_data in rand_bats.items():
+            self._sets[to_id(species_name)] = self._compile(species_name, species_data)
+
+    def _compile(self, species_name, species_data):
+        roles = species_data.get("roles", {})
+        role_names = tuple(roles)
+        weights = np.array([roles[r].get("weight", 1.0) for r in role_names], dtype=np.float32)
+        if weights.sum() > 0:
+            weights /= weights.sum()
+
+        move_probs = np.zeros((len(role_names), len(self.move_ids)), dtype=np.float32)
+        tera_types = {}
+        for i, role_name in enumerate(role_names):
+            role_data = roles[role_name]
+            for name, probability in role_data.get("moves", {}).items():
+                move_probs[i, self.move_column[to_id(name)]] = probability
+            for tera_type, probability in role_data.get("teraTypes", {}).items():
+                tera_types[tera_type] = tera_types.get(tera_type, 0.0) + float(weights[i]) * probability
+
+        return RandbatsSets(
+            id=to_id(species_name),
+            name=species_name,
+            level=species_data.get("level"),
+            roles=role_names,
+            role_weights=weights,
+            role_move_probs=move_probs,
+            items=dict(species_data.get("items", {})),
+            abilities=dict(species_data.get("abilities", {})),
+            tera_types=tera_types
+        )
+
+    def get(self, species) -> Optional[RandbatsSets]:
+        if not species:
+            return None
+        sets = self._sets.get(to_id(species.split(",")[0]))
+        if sets is None and self.resolver is not None:
+            # In-battle formes (Palafin-Hero, Ogerpon-Wellspring-Tera) use the set they changed from
+            species_id = self.resolver.resolve(species)
+            while species_id and species_id not in self._sets:
+                species_id = self.resolver.aliases.get(species_id)
+            sets = self._sets.get(species_id) if species_id else None
+        return sets
+
+    def __contains__(self, species):
+        return self.get(species) is not None
+
+    def role_posterior(self, species, revealed_moves: Iterable[str] = ()) -> np.ndarray:
+        """Role weights conditioned on the moves already revealed"""
+        sets = self.get(species)
+        if sets is None:
+            return np.zeros(0, dtype=np.float32)
+        weights = sets.role_weights.copy()
+        columns = [self.move_column[m] for m in (to_id(move) for move in revealed_moves) if m in self.move_column]
+        if columns:
+            weights *= sets.role_move_probs[:, columns].prod(axis=1)
+            if weights.sum() <= 0:
+                # Revealed moves fit no single role; fall back to the prior
+                weights = sets.role_weights.copy()
+            weights /= weights.sum()
+        return weights
+
+    def move_distribution(self, species, revealed_moves: Iterable[str] = ()) -> np.ndarray:
+        """Marginal probability of every move in the global move space"""
+        sets = self.get(species)
+        if sets is None:
+            return np.zeros(len(self.move_ids), dtype=np.float32)
+        revealed_moves = list(revealed_moves)
+        distribution = self.role_posterior(species, revealed_moves) @ sets.role_move_probs
+        for move in revealed_moves:
+            column = self.move_column.get(to_id(move))
+            if column is not None:
+                distribution[column] = 1.0
+        return distribution
+
+    def likely_moves(self, species, revealed_moves: Iterable[str] = (), min_probability=0.0) -> List[Tuple[str, float]]:
+        """(move name, probability) pairs for a species, most likely first"""
+        distribution = self.move_distribution(species, revealed_moves)
+        columns = np.flatnonzero(distribution > min_probability)
+        columns = columns[np.argsort(-distribution[columns], kind="stable")]
+        return [(self.move_names[c], round(float(distribution[c]), 4)) for c in columns]
@@ -0,0 +1,74 @@
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Commands whose payload is a single field that may itself contain "|"
+UNSPLIT_COMMANDS = frozenset({"request", "raw", "html", "uhtml", "error", "popup"})
+
+
+@dataclass(slots=True)
+class ProtocolMessage:
+    """One protocol line: the room it belongs to, its command and its arguments"""
+    room: str
+    command: str
+    args: List[str] = field(default_factory=list)
+    line: str = ""
+
+    def arg(self, index, default="") -> str:
+        return self.args[index] if index < len(self.args) else default
+
+
+def parse_line(line, room="") -> Optional[ProtocolMessage]:
+    """Parse "|command|arg|arg" into a ProtocolMessage. Plain text lines have the command "" """
+    if not line:
+        return None
+    if line[0] != "|":
+        return ProtocolMessage(room, "", [line], line)
+    command, _, rest = line[1:].partition("|")
+    if command in UNSPLIT_COMMANDS:
+        args = [rest]
+    else:
+        args = rest.split("|") if rest else []
+    return ProtocolMessage(room, command, args, line)
+
+
+def parse_frame(frame) -> Iterator[ProtocolMessage]:
+    """
+    Split a websocket frame into messages. A frame starting with ">roomid"
+    applies that room to every line in it; frames without one are global.
+    """
+    room = ""
+    lines = frame.split("\n")
+    if lines and lines[0].startswith(">"):
+        room = lines.pop(0)[1:].strip()
+    for line in lines:
+        message = parse_line(line, room)
+        if message is not None:
+            yield message
+
+
+class ProtocolDispatcher:
+    """
+    Routes messages to handlers registered per command. Lookup is one dict
+    access per line, however many commands are registered. Handlers return
+    a truthy value when they changed state; dispatch_frame reports whether
+    any of them did.
+    """
+
+    def __init__(self, handlers: Optional[Dict[str, Callable[[ProtocolMessage], object]]] = None):
+        self.handlers: Dict[str, Callable[[ProtocolMessage], object]] = dict(handlers or {})
+
+    def register(self, command, handler):
+        self.handlers[command] = handler
+
+    def dispatch(self, message: ProtocolMessage) -> bool:
+        handler = self.handlers.get(message.command)
+        return bool(handler(message)) if handler is not None else False
+
+    def dispatch_all(self, messages: Iterable[ProtocolMessage]) -> bool:
+        changed = False
+        for message in messages:
+            changed = self.dispatch(message) or changed
+        return changed
+
+    def dispatch_frame(self, frame) -> bool:
+        return self.dispatch_all(parse_frame(frame))
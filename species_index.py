@@ -0,0 +1,155 @@
+import csv
+import json
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Tuple
+
+from name_resolver import FORME_ALIASES, NameResolver, to_id
+
+# pokedex.csv column -> stat key used throughout ContextBuilder
+STAT_COLUMNS = {
+    "hp": "hp",
+    "attack": "attack",
+    "defense": "defense",
+    "s_attack": "sp_attack",
+    "s_defense": "sp_defense",
+    "speed": "speed",
+}
+
+
+@dataclass(frozen=True)
+class SpeciesRecord:
+    """Typed row combining pokedex.csv base data with the randbats set data"""
+    id: str
+    name: str
+    types: Tuple[str, ...] = ()
+    stats: Dict[str, int] = field(default_factory=dict)
+    level: Optional[int] = None
+    abilities: Dict[str, float] = field(default_factory=dict)
+    items: Dict[str, float] = field(default_factory=dict)
+    roles: Dict[str, dict] = field(default_factory=dict)
+    evs: Dict[str, int] = field(default_factory=dict)
+    ivs: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def role_names(self) -> List[str]:
+        return list(self.roles.keys())
+
+
+class SpeciesIndex:
+    """
+    Exact-match species lookups keyed on Showdown IDs.
+
+    Built once from pokedex.csv and gen9randombattle.json so that species
+    details are a dict lookup instead of a vector search per call.
+    """
+
+    def __init__(self, pokedex_path="pokedex.csv", randbats_path="gen9randombattle.json", rand_bats=None,
+                 formes_path="formes.json"):
+        self._records: Dict[str, SpeciesRecord] = {}
+
+        pokedex_rows = self._load_pokedex(pokedex_path)
+        # pokedex.csv only has base species; regional and battle formes come from formes.json
+        for species_id, row in self._load_formes(formes_path).items():
+            pokedex_rows.setdefault(species_id, row)
+        if rand_bats is None:
+            with open(randbats_path) as f:
+                rand_bats = json.load(f)
+
+        # Every pokedex species gets a record, even if it has no randbats set
+        for species_id, row in pokedex_rows.items():
+            self._records[species_id] = SpeciesRecord(
+                id=species_id,
+                name=row["name"],
+                types=row["types"],
+                stats=row["stats"],
+            )
+
+        rand_ids = {to_id(species_name) for species_name in rand_bats}
+
+        # Overlay randbats data. A forme with no row of its own stays untyped rather than
+        # borrowing the base species' types and stats
+        for species_name, set_data in rand_bats.items():
+            species_id = to_id(species_name)
+            row = pokedex_rows.get(species_id)
+            if row is None:
+                print(f"No base data for {species_name}; leaving it untyped")
+            self._records[species_id] = SpeciesRecord(
+                id=species_id,
+                name=species_name,
+                types=row["types"] if row else (),
+                stats=row["stats"] if row else {},
+                level=set_data.get("level"),
+                abilities=set_data.get("abilities", {}),
+                items=set_data.get("items", {}),
+                roles=set_data.get("roles", {}),
+                evs=set_data.get("evs", {}),
+                ivs=set_data.get("ivs", {}),
+            )
+
+        # In-battle and cosmetic formes (Palafin-Hero, Mimikyu-Busted, Ogerpon-Wellspring-Tera)
+        # have no set of their own: they keep their types and stats and take the set of the
+        # species they change from. Aliases can chain, so resolve each to a species with a set
+        for alias, target in FORME_ALIASES.items():
+            while target not in rand_ids and target in FORME_ALIASES:
+                target = FORME_ALIASES[target]
+            record, source = self._records.get(alias), self._records.get(target)
+            if alias in rand_ids or target not in rand_ids or record is None or source is None:
+                continue
+            self._records[alias] = replace(
+                source, id=alias, name=record.name,
+                types=record.types or source.types, stats=record.stats or source.stats
+            )
+
+        # Formes, cosmetic suffixes and typos resolve without embeddings
+        self.resolver = NameResolver(self._records.keys())
+
+    @staticmethod
+    def _load_pokedex(pokedex_path):
+        """Parse pokedex.csv into {species_id: {name, types, stats}}"""
+        rows = {}
+        with open(pokedex_path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                species_id = to_id(row["name"])
+                types = tuple(
+                    t.strip().capitalize()
+                    for t in row["type"].strip("{}").split(",")
+                    if t.strip()
+                )
+                stats = {}
+                for column, stat in STAT_COLUMNS.items():
+                    try:
+                        stats[stat] = int(row[column])
+                    except (TypeError, ValueError):
+                        stats[stat] = 0
+                rows[species_id] = {"name": row["name"], "types": types, "stats": stats}
+        return rows
+
+    @staticmethod
+    def _load_formes(formes_path):
+        """Parse formes.json into the same {species_id: {name, types, stats}} shape"""
+        try:
+            with open(formes_path) as f:
+                formes = json.load(f)
+        except FileNotFoundError:
+            print(f"Forme table {formes_path} not found; formes will be untyped")
+            return {}
+        return {
+            species_id: {"name": data["name"], "types": tuple(data["types"]), "stats": dict(data["stats"])}
+            for species_id, data in formes.items()
+        }
+
+    def get(self, name) -> Optional[SpeciesRecord]:
+        """Look up a species by display name, Showdown ID or details string"""
+        if not name:
+            return None
+        # Details strings look like "Slowking-Galar, L84, F"
+        record = self._records.get(to_id(name.split(",")[0]))
+        if record is None:
+            record = self._records.get(self.resolver.resolve(name))
+        return record
+
+    def __contains__(self, name):
+        return self.get(name) is not None
+
+    def __len__(self):
+        return len(self._records)
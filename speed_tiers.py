@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from damage_calc import compute_stats
+from name_resolver import to_id
+
+# Speed multipliers for each column of the table
+SPEED_VARIANTS = {
+    "base": 1.0,
+    "scarf": 1.5,
+    "paralyzed": 0.5,
+    "plus1": 1.5,
+    "plus2": 2.0,
+    "minus1": 2 / 3,
+}
+
+# Boost stage -> speed variant column
+BOOST_VARIANTS = {-1: "minus1", 0: "base", 1: "plus1", 2: "plus2"}
+
+
+class SpeedTiers:
+    """
+    In-battle speed of every randbats species at its set level, EVs and IVs.
+
+    Computed once into an (n_species, n_variants) integer array with Choice
+    Scarf, paralysis and boost columns. Each column is also kept sorted so
+    "how many species outspeed X" is a binary search, and outspeed queries
+    between groups of species are a single broadcast comparison.
+    """
+
+    def __init__(self, species_index, rand_bats):
+        self.variants: List[str] = list(SPEED_VARIANTS)
+        self.variant_column: Dict[str, int] = {v: i for i, v in enumerate(self.variants)}
+
+        ids, names, speeds = [], [], []
+        for species_name in rand_bats:
+            record = species_index.get(species_name)
+            if record is None or not record.stats:
+                continue
+            speed = compute_stats(record.stats, record.level, record.evs, record.ivs)["speed"]
+            ids.append(record.id)
+            names.append(species_name)
+            speeds.append(speed)
+
+        self.ids: List[str] = ids
+        self.names: List[str] = names
+        self.row: Dict[str, int] = {species_id: i for i, species_id in enumerate(ids)}
+        self.resolver = species_index.resolver
+        self.species_index = species_index
+
+        base = np.array(speeds, dtype=np.float32)
+        multipliers = np.array([SPEED_VARIANTS[v] for v in self.variants], dtype=np.float32)
+        self.speeds = np.floor(base[:, None] * multipliers[None, :]).astype(np.int32)
+        self._sorted = np.sort(self.speeds, axis=0)
+
+    def _row(self, species) -> Optional[int]:
+        species_id = to_id((species or "").split(",")[0])
+        row = self.row.get(species_id)
+        if row is None and self.resolver is not None:
+            row = self.row.get(self.resolver.resolve(species))
+        return row
+
+    def speed(self, species, variant="base") -> Optional[int]:
+        """Speed stat for a species in one variant column, or None if unknown"""
+        row = self._row(species)
+        if row is not None:
+            return int(self.speeds[row, self.variant_column[variant]])
+        # In-battle formes outside the table (Minior-Meteor) carry their own base speed
+        record = self.species_index.get(species)
+        if record is None or not record.stats or record.level is None:
+            return None
+        speed = compute_stats(record.stats, record.level, record.evs, record.ivs)["speed"]
+        return int(np.floor(np.float32(speed) * np.float32(SPEED_VARIANTS[variant])))
+
+    def rows(self, species: Sequence[str]) -> np.ndarray:
+        """Table rows for several species (-1 for unknown ones)"""
+        return np.array([-1 if (row := self._row(s)) is None else row for s in species], dtype=np.intp)
+
+    def outspeeds(self, ours: Sequence[str], theirs: Sequence[str], our_variant="base", their_variant="base") -> np.ndarray:
+        """(len(ours), len(theirs)) bool array: does each of ours strictly outspeed each of theirs"""
+        our_speeds = self._speeds_for(ours, our_variant)
+        their_speeds = self._speeds_for(theirs, their_variant)
+        return our_speeds[:, None] > their_speeds[None, :]
+
+    def _speeds_for(self, species, variant) -> np.ndarray:
+        return np.array([np.nan if (speed := self.speed(s, variant)) is None else speed for s in species], dtype=np.float32)
+
+    def faster_than(self, speed, variant="base") -> int:
+        """How many randbats species outspeed a given speed stat in a variant column"""
+        column = self._sorted[:, self.variant_column[variant]]
+        return int(len(column) - np.searchsorted(column, speed, side="right"))
+
+    def percentile(self, speed, variant="base") -> float:
+        """Fraction of randbats species a speed stat strictly outspeeds"""
+        column = self._sorted[:, self.variant_column[variant]]
+        return float(np.searchsorted(column, speed, side="left") / max(1, len(column)))
+
+    def tiers(self, variant="base") -> List[Tuple[int, List[str]]]:
+        """Species grouped by speed, fastest first"""
+        column = self.speeds[:, self.variant_column[variant]]
+        order = np.argsort(-column, kind="stable")
+        tiers: List[Tuple[int, List[str]]] = []
+        for row in order:
+            speed = int(column[row])
+            if tiers and tiers[-1][0] == speed:
+                tiers[-1][1].append(self.names[row])
+            else:
+                tiers.append((speed, [self.names[row]]))
+        return tiers
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from typing import Dict, List, Any, Tuple, Optional
 import os
@@ -9,16 +10,21 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Reason given for the default decision when the LLM reply is unusable
+FALLBACK_REASON = "Fallback decision due to error in LLM response parsing"
+
 class BattleStrategy:
     """
     A decision-making agent for Pokemon battles that uses LangChain and OpenAI
     to make strategic decisions based on context from ContextBuilder.
     """
     
-    def __init__(self, model_name="gpt-3.5-turbo", temperature=0.8):
+    def __init__(self, model_name="gpt-3.5-turbo", temperature=0.8, decision_timeout=30.0):
         """Initialize the strategy agent with LLM capabilities"""
         self.last_decision = None
         self.decision_history = []
+        # Seconds to wait for the LLM in make_decision_async before falling back
+        self.decision_timeout = decision_timeout
         
         # Initialize the language model
         self.llm = ChatOpenAI(
@@ -84,6 +90,7 @@ class BattleStrategy:
         Current Matchup Analysis: {matchup_analysis}
         Field Effects Analysis: {field_effects}
         Strategic Options: {strategic_options}
+        Damage Estimates (percent of target HP and KO chance per move and target): {damage_estimates}
 
         Based on this information, decide whether to use a move or switch to another Pokemon.
         Consider type matchups, effectiveness, current HP, status conditions, individual stats
@@ -104,6 +111,36 @@ class BattleStrategy:
         Returns:
             A decision dictionary with action, target/move, reason, and confidence
         """
+        messages = self._build_messages(context)
+        if messages is None:
+            return self._fallback(context, "Fallback decision: battle context could not be formatted")
+        
+        # Get the response from the LLM
+        llm_response = self.llm.invoke(messages)
+        return self._parse_decision(llm_response, context)
+    
+    async def make_decision_async(self, context: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        make_decision without blocking the event loop: the model is awaited
+        through its async API, bounded by a timeout (self.decision_timeout by
+        default). A timeout falls back to the default decision; cancelling the
+        calling task cancels the request. The prompt is built in a worker
+        thread, since materializing the context can hit the embedding API.
+        """
+        messages = await asyncio.to_thread(self._build_messages, context)
+        if messages is None:
+            return self._fallback(context, "Fallback decision: battle context could not be formatted")
+        
+        timeout = self.decision_timeout if timeout is None else timeout
+        try:
+            llm_response = await asyncio.wait_for(self.llm.ainvoke(messages), timeout)
+        except asyncio.TimeoutError:
+            print(f"LLM decision timed out after {timeout}s, using fallback")
+            return self._fallback(context, f"Fallback decision: LLM did not respond within {timeout}s")
+        return self._parse_decision(llm_response, context)
+    
+    def _build_messages(self, context: Dict[str, Any]):
+        """Prompt messages for a context, or None if it could not be formatted"""
         # Extract key information from context
         battle_state = context.get("battle_state", {})
         analysis = context.get("analysis", {})
@@ -118,8 +155,9 @@ class BattleStrategy:
         #print(self.prompt)
         # Create the prompt with all the information
         try:
-            messages = self.prompt.format_messages(
-                battle_context=json.dumps(context),
+            return self.prompt.format_messages(
+                # The full context, as before the lazy view; materialize() computes every section
+                battle_context=json.dumps(context.materialize() if hasattr(context, "materialize") else context),
                 player_active=self._format_pokemon(battle_state.get("player", {}).get("active")),
                 opponent_active=self._format_pokemon(battle_state.get("opponent", {}).get("active")),
                 player_team=self._format_team(battle_state.get("player", {}).get("team", [])),
@@ -130,21 +168,29 @@ class BattleStrategy:
                 matchup_analysis=json.dumps(analysis.get("current_matchup", {}), indent=2),
                 field_effects=json.dumps(analysis.get("field_effects", {}), indent=2),
                 strategic_options=json.dumps(analysis.get("strategic_options", {}), indent=2),
+                damage_estimates=json.dumps(analysis.get("damage_estimates", {}), indent=2),
                 format_instructions=format_instructions
             )
         except Exception as e:
             print(f"Error formatting context: {e}")
-            fallback_decision = self._generate_fallback_decision(battle_state)
-            self._record_decision(fallback_decision)
-            return fallback_decision
-        
-        # Get the response from the LLM
-        llm_response = self.llm.invoke(messages)
-        
-            # Parse the structured output
-        decision = self.output_parser.parse(llm_response.content)
+            return None
+    
+    def _fallback(self, context: Dict[str, Any], reason: str = FALLBACK_REASON) -> Dict[str, Any]:
+        fallback_decision = self._generate_fallback_decision(
+            context.get("battle_state", {}), context.get("analysis", {}).get("damage_estimates"), reason
+        )
+        self._record_decision(fallback_decision)
+        return fallback_decision
+    
+    def _parse_decision(self, llm_response, context: Dict[str, Any]) -> Dict[str, Any]:
+        # Parse the structured output; a malformed reply still gets a move sent
+        try:
+            decision = self.output_parser.parse(llm_response.content)
+        except Exception as e:
+            print(f"Error parsing LLM response: {e}")
+            return self._fallback(context)
             
-            # Ensure confidence is a float between 0 and 1
+        # Ensure confidence is a float between 0 and 1
         decision["confidence"] = float(decision.get("confidence", 0.5))
         decision["confidence"] = max(0.0, min(1.0, decision["confidence"]))
         
@@ -152,10 +198,6 @@ class BattleStrategy:
         self._record_decision(decision)
         
         return decision
-            
-        # except Exception as e:
-        #     # Fallback in case of parsing error
-        #     print(f"Error parsing LLM response: {e}")
  
     
     def _format_context_for_prompt(self, context: Dict[str, Any]) -> str:
@@ -226,18 +268,30 @@ class BattleStrategy:
             
         return " | ".join(team_info)
     
-    def _generate_fallback_decision(self, battle_state: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate a fallback decision when LLM parsing fails"""
+    def _generate_fallback_decision(self, battle_state: Dict[str, Any],
+                                    damage_estimates: Optional[Dict[str, Any]] = None,
+                                    reason: str = FALLBACK_REASON) -> Dict[str, Any]:
+        """Generate a fallback decision when the LLM gives no usable decision"""
         player_active = battle_state.get("player", {}).get("active")
         
         if not player_active:
             return {
                 "action": "move",
                 "target": "struggle",
-                "reason": "Fallback decision due to error in LLM response parsing",
+                "reason": reason,
                 "confidence": 0.3
             }
             
+        # Prefer the move most likely to KO the opponent's active, then the hardest hitting one
+        best_move = self._best_damaging_move(damage_estimates)
+        if best_move:
+            return {
+                "action": "move",
+                "target": best_move,
+                "reason": f"{reason}; highest estimated damage",
+                "confidence": 0.3
+            }
+        
         # Get the first available move
         moves = player_active.get("moves", [])
         first_move = moves[0] if moves else "struggle"
@@ -245,10 +299,24 @@ class BattleStrategy:
         return {
             "action": "move",
             "target": first_move,
-            "reason": "Fallback decision due to error in LLM response parsing",
+            "reason": reason,
             "confidence": 0.3
         }
     
+    def _best_damaging_move(self, damage_estimates: Optional[Dict[str, Any]]) -> Optional[str]:
+        """Our move with the best (KO chance, max damage) against the opponent's active, if any deals damage"""
+        player_moves = (damage_estimates or {}).get("player_moves") or {}
+        best, best_score = None, (0.0, 0.0)
+        for move, targets in player_moves.items():
+            # The opponent's active is the first target in each row
+            estimate = next(iter(targets.values()), None) if targets else None
+            if not estimate:
+                continue
+            score = (estimate.get("ko_probability", 0.0), estimate.get("max_percent", 0.0))
+            if score > best_score:
+                best, best_score = move, score
+        return best
+    
     def _record_decision(self, decision: Dict[str, Any]) -> None:
         """Record the decision for history tracking"""
         self.last_decision = decision
@@ -285,7 +353,31 @@ class BattleStrategy:
         """Analyze the trend of the battle based on decision history"""
         if len(self.decision_history) < 3:
             return {"status": "Not enough history for trend analysis"}
-            
+        
+        trend_analysis = self.llm.invoke(self._trend_messages())
+        
+        return {
+            "analysis": trend_analysis.content,
+            "decisions_analyzed": len(self.decision_history)
+        }
+    
+    async def analyze_battle_trend_async(self, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """analyze_battle_trend through the model's async API, bounded by a timeout"""
+        if len(self.decision_history) < 3:
+            return {"status": "Not enough history for trend analysis"}
+        
+        timeout = self.decision_timeout if timeout is None else timeout
+        try:
+            trend_analysis = await asyncio.wait_for(self.llm.ainvoke(self._trend_messages()), timeout)
+        except asyncio.TimeoutError:
+            return {"status": f"Trend analysis timed out after {timeout}s"}
+        
+        return {
+            "analysis": trend_analysis.content,
+            "decisions_analyzed": len(self.decision_history)
+        }
+    
+    def _trend_messages(self):
         # Use LLM to analyze the battle trend
         trend_prompt = ChatPromptTemplate.from_template("""
         You are a Pokemon battle expert AI assistant. Analyze the following battle decision history and identify trends, patterns, and strategic insights.
@@ -301,13 +393,6 @@ class BattleStrategy:
         Provide your analysis in a structured format.
         """)
         
-        prompt_value = trend_prompt.format_messages(
+        return trend_prompt.format_messages(
             decision_history=json.dumps(self.decision_history, indent=2)
         )
-        
-        trend_analysis = self.llm.invoke(prompt_value)
-        
-        return {
-            "analysis": trend_analysis.content,
-            "decisions_analyzed": len(self.decision_history)
-        }
@@ -6,7 +6,7 @@ from langchain_community.document_loaders import DirectoryLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_openai import OpenAIEmbeddings
+from embeddings import get_embeddings
 from dotenv import load_dotenv
 
 import os
@@ -24,7 +24,7 @@ split_docs = pokemon_strategy_transcript_chunker(documents)
 # text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=10, separators=["?",".","\n","!"])
 # split_docs = text_splitter.split_documents(documents)
 #create an embedded vector database of the embeddings
-embeddings_model = OpenAIEmbeddings(model="text-embedding-3-small")
+embeddings_model = get_embeddings(model="text-embedding-3-small")
 vector_store = InMemoryVectorStore(embedding=embeddings_model)
 vector_store.add_documents(split_docs)
 retriever = vector_store.as_retriever()
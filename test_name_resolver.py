@@ -0,0 +1,58 @@
+from name_resolver import NameResolver, edit_distance
+
+SPECIES = [
+    "garchomp", "gabite", "gible", "tornadus", "tornadustherian", "landorus", "landorustherian",
+    "rotom", "rotomwash", "rotomheat", "rotomfan", "rotomfrost", "rotommow", "urshifu",
+    "urshifurapidstrike", "urshifurapidstrikegmax", "vivillon", "dragapult", "cramorant", "ogerpon", "ogerponwellspring",
+]
+
+
+def make_resolver():
+    return NameResolver(SPECIES)
+
+
+def test_exact_and_details_string():
+    resolver = make_resolver()
+    assert resolver.resolve("Garchomp") == "garchomp"
+    assert resolver.resolve("Garchomp, L77, F") == "garchomp"
+
+
+def test_transpositions():
+    resolver = make_resolver()
+    assert resolver.resolve("Grachomp") == "garchomp"
+    assert resolver.resolve("Dragaplut") == "dragapult"
+    assert resolver.resolve("Lnadorus") == "landorus"
+
+
+def test_forme_abbreviations():
+    resolver = make_resolver()
+    assert resolver.resolve("Tornadus-T") == "tornadustherian"
+    assert resolver.resolve("Landorus-T") == "landorustherian"
+    assert resolver.resolve("Rotom-W") == "rotomwash"
+    assert resolver.resolve("Urshifu-R") == "urshifurapidstrike"
+
+
+def test_unmatched_forme_is_not_its_base_species():
+    resolver = make_resolver()
+    # "F" could be Fan or Frost
+    assert resolver.resolve("Rotom-F") is None
+    assert resolver.resolve("Vivillon-Zzz") is None
+
+
+def test_aliases_and_ignored_suffixes():
+    resolver = make_resolver()
+    assert resolver.resolve("Cramorant-Gulping") == "cramorant"
+    assert resolver.resolve("Urshifu-*") == "urshifu"
+    assert resolver.resolve("Ogerpon-Wellspring-Tera") == "ogerponwellspring"
+
+
+def test_garbage_resolves_to_none():
+    resolver = make_resolver()
+    assert resolver.resolve("qwzxv") is None
+    assert resolver.resolve("") is None
+
+
+def test_edit_distance_counts_swaps_once():
+    assert edit_distance("grachomp", "garchomp") == 1
+    assert edit_distance("garchomp", "garchomp") == 0
+    assert edit_distance("kitten", "sitting") == 3
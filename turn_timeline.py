@@ -0,0 +1,155 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+class TurnTimeline:
+    """
+    Fixed-size columnar ring buffer with one entry per turn.
+
+    Each entry holds the turn number, both actives' species (interned to
+    small ints), their HP percent and status codes, and the weather/terrain
+    codes. Opponent usage counts and per-entry HP changes are updated as
+    entries are written or overwritten, so reading them never rescans the
+    history, and memory stays bounded however long a stall game runs.
+    Writing the same turn again replaces that turn's entry in place.
+    """
+
+    def __init__(self, capacity=20):
+        self.capacity = capacity
+        self.turn = np.full(capacity, -1, dtype=np.int32)
+        self.player_species = np.full(capacity, -1, dtype=np.int16)
+        self.opponent_species = np.full(capacity, -1, dtype=np.int16)
+        self.player_hp = np.zeros(capacity, dtype=np.int16)
+        self.opponent_hp = np.zeros(capacity, dtype=np.int16)
+        self.player_status = np.full(capacity, -1, dtype=np.int8)
+        self.opponent_status = np.full(capacity, -1, dtype=np.int8)
+        self.weather = np.full(capacity, -1, dtype=np.int8)
+        self.terrain = np.full(capacity, -1, dtype=np.int8)
+        self.player_hp_change = np.zeros(capacity, dtype=np.int16)
+        self.opponent_hp_change = np.zeros(capacity, dtype=np.int16)
+
+        self.count = 0
+        self._next = 0
+        self.version = 0
+
+        # Interned strings (species names, statuses, weather/terrain) and their codes
+        self._names: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.opponent_usage: Dict[int, int] = {}
+
+    def _code(self, name) -> int:
+        if not name:
+            return -1
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self._names)
+            self._names.append(name)
+        return code
+
+    def _name(self, code) -> Optional[str]:
+        return self._names[code] if code >= 0 else None
+
+    def _slot(self, age) -> int:
+        """Slot of the entry `age` turns back (0 is the latest)"""
+        return (self._next - 1 - age) % self.capacity
+
+    def record(self, turn, player=None, opponent=None, weather=None, terrain=None):
+        """
+        Write the state for a turn. `player`/`opponent` are (species, hp_percent,
+        status) tuples or None. Returns True if anything changed.
+        """
+        player_code, player_hp, player_status = self._encode(player)
+        opponent_code, opponent_hp, opponent_status = self._encode(opponent)
+        row = (turn, player_code, player_hp, player_status, opponent_code, opponent_hp, opponent_status,
+               self._code(weather), self._code(terrain))
+
+        if self.count and self.turn[self._slot(0)] == turn:
+            slot = self._slot(0)
+            if self._row(slot) == row:
+                return False
+            self._forget(slot)
+        else:
+            slot = self._next
+            if self.count == self.capacity:
+                self._forget(slot)
+            else:
+                self.count += 1
+            self._next = (self._next + 1) % self.capacity
+
+        (self.turn[slot], self.player_species[slot], self.player_hp[slot], self.player_status[slot],
+         self.opponent_species[slot], self.opponent_hp[slot], self.opponent_status[slot],
+         self.weather[slot], self.terrain[slot]) = row
+
+        # HP change against the previous entry, when the same Pokemon stayed in
+        previous = self._slot(1) if self.count > 1 else None
+        self.player_hp_change[slot] = 0
+        self.opponent_hp_change[slot] = 0
+        if previous is not None:
+            if player_code >= 0 and self.player_species[previous] == player_code:
+                self.player_hp_change[slot] = player_hp - self.player_hp[previous]
+            if opponent_code >= 0 and self.opponent_species[previous] == opponent_code:
+                self.opponent_hp_change[slot] = opponent_hp - self.opponent_hp[previous]
+
+        if opponent_code >= 0:
+            self.opponent_usage[opponent_code] = self.opponent_usage.get(opponent_code, 0) + 1
+        self.version += 1
+        return True
+
+    def _encode(self, side):
+        if not side:
+            return -1, 0, -1
+        species, hp, status = side
+        return self._code(species), int(hp), self._code(status)
+
+    def _row(self, slot):
+        return (int(self.turn[slot]), int(self.player_species[slot]), int(self.player_hp[slot]),
+                int(self.player_status[slot]), int(self.opponent_species[slot]), int(self.opponent_hp[slot]),
+                int(self.opponent_status[slot]), int(self.weather[slot]), int(self.terrain[slot]))
+
+    def _forget(self, slot):
+        """Remove an entry's contribution to the running counts before it is overwritten"""
+        code = int(self.opponent_species[slot])
+        if code >= 0:
+            self.opponent_usage[code] -= 1
+            if not self.opponent_usage[code]:
+                del self.opponent_usage[code]
+
+    def __len__(self):
+        return self.count
+
+    def usage(self) -> Dict[str, int]:
+        """Turns each opponent species was active within the window"""
+        return {self._names[code]: count for code, count in self.opponent_usage.items()}
+
+    def snapshot(self, age=0) -> Dict:
+        """Entry `age` turns back as a dict"""
+        slot = self._slot(age)
+
+        def side(species, hp, status):
+            if species < 0:
+                return None
+            return {"name": self._names[species], "hp": int(hp), "status": self._name(status)}
+
+        return {
+            "turn": int(self.turn[slot]),
+            "player_active": side(self.player_species[slot], self.player_hp[slot], self.player_status[slot]),
+            "opponent_active": side(self.opponent_species[slot], self.opponent_hp[slot], self.opponent_status[slot]),
+            "weather": self._name(self.weather[slot]),
+            "terrain": self._name(self.terrain[slot])
+        }
+
+    def recent(self, n=3) -> List[Dict]:
+        """The last n entries, oldest first"""
+        return [self.snapshot(age) for age in range(min(n, self.count) - 1, -1, -1)]
+
+    def hp_trends(self) -> List[Dict]:
+        """HP change of each entry against the one before it, oldest first"""
+        return [
+            {
+                "turn": int(self.turn[slot]),
+                "player_hp_change": int(self.player_hp_change[slot]),
+                "opponent_hp_change": int(self.opponent_hp_change[slot])
+            }
+            for slot in (self._slot(age) for age in range(self.count - 2, -1, -1))
+        ]
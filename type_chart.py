@@ -0,0 +1,191 @@
+import csv
+from dataclasses import dataclass
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+def _bits(flags) -> int:
+    """Pack a boolean array into an int bitmask (bit i is flags[i])"""
+    mask = 0
+    for i in np.flatnonzero(flags):
+        mask |= 1 << int(i)
+    return mask
+
+
+@dataclass(frozen=True)
+class Coverage:
+    """
+    Offensive coverage of one or more moves as bitmasks.
+
+    `super_effective`, `resisted` and `immune` are 18-bit masks over single
+    defending types (bit i is TypeChart.types[i]); `combos` is a 171-bit mask
+    of the mono/dual combinations hit super effectively, for exact answers
+    against dual types. Combining with `|` unions what is hit super
+    effectively and intersects what every move is resisted by or immune to.
+    """
+    super_effective: int = 0
+    resisted: int = 0
+    immune: int = 0
+    combos: int = 0
+
+    def __or__(self, other: "Coverage") -> "Coverage":
+        return Coverage(
+            self.super_effective | other.super_effective,
+            self.resisted & other.resisted,
+            self.immune & other.immune,
+            self.combos | other.combos
+        )
+
+    def hits(self, combo_bit: int) -> bool:
+        """Whether any move is super effective against a defender's combination bit"""
+        return bool(self.combos & combo_bit)
+
+
+class TypeChart:
+    """
+    Compiled type-effectiveness engine backed by NumPy arrays.
+
+    `matrix[a, d]` is the multiplier of attacking type `a` against the single
+    defending type `d`. `combo_table[a, c]` holds the multiplier against every
+    mono and dual defending combination `c` (18 + 153 = 171 columns), so the
+    damage multiplier for any attack/defender pair is one array lookup.
+    Tera defenders are mono-type columns.
+    """
+
+    def __init__(self, csv_path="typing_chart.csv"):
+        self.types: List[str] = []
+        self.type_index: Dict[str, int] = {}
+        self.matrix = self._parse_csv(csv_path)
+
+        # Enumerate every defending combination: monotypes first, then dual types
+        n = len(self.types)
+        self.combos: List[Tuple[str, ...]] = [(t,) for t in self.types]
+        self.combos += [(self.types[i], self.types[j]) for i, j in combinations(range(n), 2)]
+        self.combo_index: Dict[Tuple[int, ...], int] = {}
+        for column, combo in enumerate(self.combos):
+            self.combo_index[tuple(self.type_index[t] for t in combo)] = column
+
+        self.combo_table = np.ones((n, len(self.combos)), dtype=np.float32)
+        for column, combo in enumerate(self.combos):
+            for type_name in combo:
+                self.combo_table[:, column] *= self.matrix[:, self.type_index[type_name]]
+
+        # Extra neutral row/column so unknown types ("???", "Stellar") index safely
+        self._neutral_attack = n
+        self._neutral_defender = len(self.combos)
+        self._attack_table = np.ones((n + 1, len(self.combos) + 1), dtype=np.float32)
+        self._attack_table[:n, :len(self.combos)] = self.combo_table
+
+        # Bitmasks per attacking type, over single types and over combinations
+        self.full_mask = (1 << n) - 1
+        self.super_effective_masks = [_bits(self.matrix[a] > 1) for a in range(n)]
+        self.resisted_masks = [_bits((self.matrix[a] < 1) & (self.matrix[a] > 0)) for a in range(n)]
+        self.immune_masks = [_bits(self.matrix[a] == 0) for a in range(n)]
+        self.combo_masks = [_bits(self.combo_table[a] > 1) for a in range(n)]
+        self._coverage = [
+            Coverage(self.super_effective_masks[a], self.resisted_masks[a], self.immune_masks[a], self.combo_masks[a])
+            for a in range(n)
+        ]
+        self._effectiveness = {t: dict(zip(self.types, self.matrix[a].tolist())) for t, a in self.type_index.items()}
+
+    def _parse_csv(self, csv_path):
+        """Parse the typing chart CSV into an 18x18 float matrix (blank cells are neutral)"""
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.reader(f))
+
+        self.types = [t.strip() for t in rows[0][1:]]
+        self.type_index = {t: i for i, t in enumerate(self.types)}
+        matrix = np.ones((len(self.types), len(self.types)), dtype=np.float32)
+
+        for row in rows[1:]:
+            if not row or row[0].strip() not in self.type_index:
+                continue
+            attacking = self.type_index[row[0].strip()]
+            for j, value in enumerate(row[1:len(self.types) + 1]):
+                if value.strip():
+                    matrix[attacking, j] = float(value)
+        return matrix
+
+    def normalize(self, type_name) -> Optional[str]:
+        """Return the canonical capitalized type name, or None if unknown"""
+        if not type_name:
+            return None
+        type_name = str(type_name).strip().capitalize()
+        return type_name if type_name in self.type_index else None
+
+    def attack_index(self, type_name) -> int:
+        """Row index of an attacking type (unknown types map to a neutral row)"""
+        type_name = self.normalize(type_name)
+        return self.type_index[type_name] if type_name else self._neutral_attack
+
+    def defender_index(self, defending_types: Iterable[str]) -> int:
+        """Column index of a mono/dual defending combination (unknown maps to neutral)"""
+        indices = sorted({
+            self.type_index[t]
+            for t in (self.normalize(name) for name in defending_types or [])
+            if t
+        })
+        return self.combo_index.get(tuple(indices[:2]), self._neutral_defender)
+
+    def multiplier(self, attacking_type, defending_types) -> float:
+        """Multiplier of one attacking type against a defender's types"""
+        return float(self._attack_table[self.attack_index(attacking_type), self.defender_index(defending_types)])
+
+    def multipliers(self, move_types: Sequence[str], defenders: Sequence[Iterable[str]]) -> np.ndarray:
+        """Multipliers of N move types against M defenders as an (N, M) array"""
+        rows = np.fromiter((self.attack_index(t) for t in move_types), dtype=np.intp, count=len(move_types))
+        columns = np.fromiter((self.defender_index(d) for d in defenders), dtype=np.intp, count=len(defenders))
+        return self._attack_table[np.ix_(rows, columns)]
+
+    def weaknesses(self, defending_types) -> List[str]:
+        """Attacking types that are super effective against the combined typing"""
+        column = self._attack_table[:len(self.types), self.defender_index(defending_types)]
+        return [self.types[i] for i in np.flatnonzero(column > 1)]
+
+    def resistances(self, defending_types) -> List[str]:
+        """Attacking types the combined typing resists or is immune to"""
+        column = self._attack_table[:len(self.types), self.defender_index(defending_types)]
+        return [self.types[i] for i in np.flatnonzero(column < 1)]
+
+    def strengths(self, attacking_type) -> List[str]:
+        """Single defending types this attacking type hits super effectively"""
+        type_name = self.normalize(attacking_type)
+        if not type_name:
+            return []
+        return [self.types[i] for i in np.flatnonzero(self.matrix[self.type_index[type_name]] > 1)]
+
+    def effectiveness(self, attacking_type) -> Dict[str, float]:
+        """Multiplier of an attacking type against every single defending type"""
+        type_name = self.normalize(attacking_type)
+        if not type_name:
+            return {t: 1.0 for t in self.types}
+        return dict(self._effectiveness[type_name])
+
+    def type_mask(self, types: Iterable[str]) -> int:
+        """Bitmask of single types"""
+        mask = 0
+        for type_name in types or []:
+            type_name = self.normalize(type_name)
+            if type_name:
+                mask |= 1 << self.type_index[type_name]
+        return mask
+
+    def mask_types(self, mask: int) -> List[str]:
+        """Type names for the bits set in a mask"""
+        return [t for i, t in enumerate(self.types) if mask >> i & 1]
+
+    def combo_bit(self, defending_types) -> int:
+        """Single bit for a defender's mono/dual combination (0 if unknown)"""
+        column = self.defender_index(defending_types)
+        return 1 << column if column != self._neutral_defender else 0
+
+    def coverage(self, attacking_types: Iterable[str]) -> Coverage:
+        """Combined coverage of a set of move types (unknown types are neutral)"""
+        result = None
+        for type_name in attacking_types:
+            type_name = self.normalize(type_name)
+            move = self._coverage[self.type_index[type_name]] if type_name else Coverage()
+            result = move if result is None else result | move
+        return result or Coverage()
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import re
+import weakref
+from typing import Dict, List
+
+import chromadb
+from langchain_chroma import Chroma
+from langchain_core.documents import Document
+
+PERSIST_DIRECTORY = os.getenv("CHROMA_PERSIST_DIR", ".chroma")
+MANIFEST_FILE = "fingerprints.json"
+# Largest Chroma (squared L2) distance accepted as a match; 1.0 is cosine similarity 0.5 for unit vectors
+MAX_MATCH_DISTANCE = float(os.getenv("VECTOR_MATCH_MAX_DISTANCE", "1.0"))
+
+# One chromadb client per persist directory, and the native collection behind each store
+_clients: Dict[str, "chromadb.ClientAPI"] = {}
+_native_collections: "weakref.WeakKeyDictionary[Chroma, chromadb.Collection]" = weakref.WeakKeyDictionary()
+
+
+def embedding_model_name(embedding_function) -> str:
+    """Name of the model behind an embedding function, used to key stored vectors"""
+    return getattr(embedding_function, "model", None) or type(embedding_function).__name__
+
+
+def file_hash(path) -> str:
+    """sha256 of a source file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def document_id(document: Document, model: str) -> str:
+    """Content-addressed ID, so unchanged documents keep their stored vector"""
+    return hashlib.sha256(f"{model}\0{document.page_content}".encode("utf-8")).hexdigest()
+
+
+def _collection_name(name, model):
+    # Chroma names allow 3-63 chars of [a-zA-Z0-9._-]
+    safe_model = re.sub(r"[^a-zA-Z0-9._-]", "-", model)
+    return f"{name}--{safe_model}"[:63].rstrip("-_.")
+
+
+def _read_manifest(persist_directory) -> Dict[str, dict]:
+    try:
+        with open(os.path.join(persist_directory, MANIFEST_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(persist_directory, manifest):
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def batch_query(store: Chroma, vectors, k=1, max_distance=MAX_MATCH_DISTANCE) -> List[List[str]]:
+    """
+    Query a collection with a whole batch of embeddings in one call; page contents per query.
+    Matches farther than max_distance are dropped, so a name with nothing
+    similar in the collection gets no match instead of an arbitrary one.
+    """
+    if not len(vectors):
+        return []
+    result = _native_collections[store].query(
+        query_embeddings=[list(vector) for vector in vectors],
+        n_results=k,
+        include=["documents", "metadatas", "distances"]
+    )
+    return [
+        [document for document, distance in zip(documents or [], distances or []) if distance <= max_distance]
+        for documents, distances in zip(result["documents"], result["distances"])
+    ]
+
+
+def open_collection(name, documents: List[Document], embedding_function, source_paths,
+                    persist_directory=PERSIST_DIRECTORY) -> Chroma:
+    """
+    Open a persisted Chroma collection, embedding only what changed.
+
+    The collection is fingerprinted by the sha256 of its source files and the
+    embedding model name. A warm start with a matching fingerprint loads the
+    stored vectors without any embedding calls; otherwise only documents whose
+    content hash is not already stored get embedded, and stale ones are removed.
+    """
+    model = embedding_model_name(embedding_function)
+    collection_name = _collection_name(name, model)
+    client = _clients.get(persist_directory)
+    if client is None:
+        client = _clients[persist_directory] = chromadb.PersistentClient(path=persist_directory)
+    store = Chroma(
+        collection_name=collection_name,
+        embedding_function=embedding_function,
+        client=client
+    )
+    _native_collections[store] = client.get_collection(collection_name)
+
+    fingerprint = {
+        "model": model,
+        "sources": {path: file_hash(path) for path in source_paths}
+    }
+    manifest = _read_manifest(persist_directory)
+    if manifest.get(collection_name) == fingerprint:
+        return store
+
+    # Deduplicate by content hash; identical rows share one vector
+    wanted = {}
+    for document in documents:
+        wanted.setdefault(document_id(document, model), document)
+
+    existing = set(store.get(include=[])["ids"])
+    stale = existing - wanted.keys()
+    missing = [doc_id for doc_id in wanted if doc_id not in existing]
+
+    if stale:
+        store.delete(ids=list(stale))
+    if missing:
+        print(f"Embedding {len(missing)} new documents for {collection_name}")
+        store.add_documents([wanted[doc_id] for doc_id in missing], ids=missing)
+
+    manifest[collection_name] = fingerprint
+    _write_manifest(persist_directory, manifest)
+    return store